@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from foodgram.db import check_default_connection
+
+        from . import checks, signals  # noqa: F401
+
+        request_started.connect(
+            check_default_connection, dispatch_uid='check_default_connection'
+        )
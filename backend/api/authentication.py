@@ -0,0 +1,77 @@
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from users.models import User
+
+# Метка в кэше для ключа, которого нет в базе.
+INVALID_TOKEN = 0
+
+# Поля пользователя, нужные аутентификации и проверкам прав.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'role',
+    'is_active', 'is_staff', 'is_superuser', 'shoping_cart_id',
+)
+
+
+def _token_key(key):
+    return f'auth:token:{key}'
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget_token(key):
+    caches['auth_tokens'].delete(_token_key(key))
+
+
+def forget_user(user_id):
+    caches['auth_tokens'].delete(_user_key(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который берёт пару токен → пользователь из кэша.
+
+    Токен и пользователь хранятся под разными ключами, чтобы изменение
+    пользователя сбрасывало одну запись, а выход — другую. Из пользователя
+    кэшируются только CACHED_USER_FIELDS, без хеша пароля: остальные поля
+    догружаются из базы при первом обращении.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = caches['auth_tokens']
+        user_id = cache.get(_token_key(key))
+        if user_id == INVALID_TOKEN:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        fields = None if user_id is None else cache.get(_user_key(user_id))
+        if fields is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                cache.set(_token_key(key), INVALID_TOKEN)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user = token.user
+            cache.set_many({
+                _token_key(key): user.pk,
+                _user_key(user.pk): {
+                    name: getattr(user, name) for name in CACHED_USER_FIELDS
+                },
+            })
+        else:
+            # from_db ждёт значения в порядке полей модели.
+            names = [
+                field.attname for field in User._meta.concrete_fields
+                if field.attname in fields
+            ]
+            user = User.from_db(
+                DEFAULT_DB_ALIAS, names, [fields[name] for name in names]
+            )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, self.get_model()(key=key, user_id=user.pk)
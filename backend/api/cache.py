@@ -0,0 +1,56 @@
+import time
+from hashlib import sha256
+
+from django.core.cache import caches
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(model):
+    return f'catalogue:{model._meta.label_lower}:version'
+
+
+def get_catalogue_version(model):
+    """Время последнего изменения справочника, хранимое в кэше.
+
+    Версия живет столько же, сколько данные: воркер, не получивший
+    сигнал об изменении, обновит ее не позже чем через TIMEOUT кэша.
+    """
+    cache = caches['catalogue']
+    version = cache.get(_version_key(model))
+    if version is None:
+        version = time.time()
+        cache.add(_version_key(model), version)
+        version = cache.get(_version_key(model), version)
+    return version
+
+
+def invalidate_catalogue(model):
+    caches['catalogue'].set(_version_key(model), time.time())
+
+
+class CatalogueCacheMixin:
+    """Кэширует список справочника и отвечает 304 по If-None-Match."""
+
+    catalogue_model = None
+
+    def list(self, request, *args, **kwargs):
+        version = get_catalogue_version(self.catalogue_model)
+        path = request.get_full_path()
+        etag = quote_etag(sha256(
+            f'{version}:{request.accepted_renderer.format}:{path}'.encode()
+        ).hexdigest()[:32])
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(version),
+        }
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        cache = caches['catalogue']
+        key = f'catalogue:{self.catalogue_model._meta.label_lower}:{etag}'
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data)
+        return Response(data, headers=headers)
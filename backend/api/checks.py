@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Кэши, которые должны быть общими для всех воркеров."""
+    errors = []
+    if settings.CACHES['auth_tokens']['BACKEND'] == LOCAL_CACHE_BACKEND:
+        errors.append(Warning(
+            'Кэш auth_tokens локален для процесса: после выхода токен '
+            'еще принимается другими воркерами до истечения TIMEOUT.',
+            hint='Укажите общий AUTH_TOKEN_CACHE_BACKEND, например memcached.',
+            id='api.W001',
+        ))
+    if (
+        settings.DATABASE_REPLICAS
+        and settings.CACHES['replication']['BACKEND'] == LOCAL_CACHE_BACKEND
+    ):
+        errors.append(Error(
+            'Кэш replication локален для процесса: после записи другие '
+            'воркеры продолжат читать с реплики.',
+            hint=(
+                'Укажите общий REPLICATION_CACHE_BACKEND, '
+                'например memcached.'
+            ),
+            id='api.E001',
+        ))
+    return errors
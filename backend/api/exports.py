@@ -0,0 +1,173 @@
+import csv
+import json
+
+
+SHOPPING_LIST_RENDERERS = {}
+
+
+def register_renderer(format):
+    def decorator(renderer_class):
+        SHOPPING_LIST_RENDERERS[format] = renderer_class()
+        return renderer_class
+    return decorator
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class BaseShoppingListRenderer:
+    content_type = None
+    extension = None
+
+    def render(self, rows):
+        raise NotImplementedError
+
+
+@register_renderer('txt')
+class TextRenderer(BaseShoppingListRenderer):
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def render(self, rows):
+        for row in rows:
+            yield (
+                f'{row["name"]} - {row["amount"]} '
+                f'{row["measurement_unit"]}\n'
+            )
+
+
+@register_renderer('csv')
+class CsvRenderer(BaseShoppingListRenderer):
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def render(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Количество', 'Единица измерения')
+        )
+        for row in rows:
+            yield writer.writerow(
+                (row['name'], row['amount'], row['measurement_unit'])
+            )
+
+
+@register_renderer('json')
+class JsonRenderer(BaseShoppingListRenderer):
+    content_type = 'application/json'
+    extension = 'json'
+
+    def render(self, rows):
+        separator = '['
+        for row in rows:
+            yield separator + json.dumps(row, ensure_ascii=False)
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+def _cp1251_differences():
+    names = []
+    for code in range(128, 256):
+        try:
+            char = bytes([code]).decode('cp1251')
+        except UnicodeDecodeError:
+            char = '?'
+        names.append('/uni%04X' % ord(char))
+    return '[128 ' + ' '.join(names) + ']'
+
+
+class PdfWriter:
+    """Пишет объекты PDF по одному, запоминая смещения для xref."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+
+    def write(self, data):
+        self.offset += len(data)
+        return data
+
+    def object(self, number, body):
+        self.offsets[number] = self.offset
+        return self.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def stream(self, number, data):
+        return self.object(
+            number,
+            b'<< /Length %d >>\nstream\n%s\nendstream' % (len(data), data)
+        )
+
+    def trailer(self, root):
+        size = max(self.offsets) + 1
+        xref_offset = self.offset
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % size]
+        for number in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self.offsets[number])
+        xref.append(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, root, xref_offset)
+        )
+        return self.write(b''.join(xref))
+
+
+@register_renderer('pdf')
+class PdfRenderer(BaseShoppingListRenderer):
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    lines_per_page = 50
+    font_size = 12
+    leading = 15
+
+    def _escape(self, line):
+        return line.encode('cp1251', errors='replace').replace(
+            b'\\', b'\\\\'
+        ).replace(b'(', b'\\(').replace(b')', b'\\)')
+
+    def _page(self, writer, number, lines):
+        content = [b'BT /F1 %d Tf %d TL 40 800 Td' % (
+            self.font_size, self.leading
+        )]
+        content.extend(b'(%s) Tj T*' % self._escape(line) for line in lines)
+        content.append(b'ET')
+        yield writer.stream(number, b'\n'.join(content))
+        yield writer.object(
+            number + 1,
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> '
+            b'/Contents %d 0 R >>' % number
+        )
+
+    def render(self, rows):
+        writer = PdfWriter()
+        yield writer.write(b'%PDF-1.4\n')
+        yield writer.object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        yield writer.object(
+            3,
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+            b'/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+            b'/Differences ' + _cp1251_differences().encode() + b' >> >>'
+        )
+        pages = []
+        lines = []
+        number = 4
+        for row in rows:
+            lines.append(
+                f'{row["name"]} - {row["amount"]} {row["measurement_unit"]}'
+            )
+            if len(lines) == self.lines_per_page:
+                yield from self._page(writer, number, lines)
+                pages.append(number + 1)
+                lines = []
+                number += 2
+        if lines or not pages:
+            yield from self._page(writer, number, lines)
+            pages.append(number + 1)
+        yield writer.object(
+            2,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                b' '.join(b'%d 0 R' % page for page in pages), len(pages)
+            )
+        )
+        yield writer.trailer(root=1)
@@ -1,7 +1,20 @@
 from django_filters import FilterSet, CharFilter
-from django_filters import NumberFilter
+from django_filters import NumberFilter, OrderingFilter
+from django_filters.constants import EMPTY_VALUES
 
 from recipes.models import Tag, Recipe
+from users.models import User
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Добавляет id в конец сортировки, чтобы она совпадала с индексом."""
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        ordering = [self.get_ordering_value(param) for param in value]
+        ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return qs.order_by(*ordering)
 
 
 class RecipeFilterBackend(FilterSet):
@@ -9,28 +22,51 @@ class RecipeFilterBackend(FilterSet):
         field_name='tags__slug',
         method='filter_tags'
     )
+    ordering = RecipeOrderingFilter(
+        fields=(
+            ('favorites_count', 'favorites'),
+            ('created', 'created'),
+            ('cooking_time', 'cooking_time'),
+        )
+    )
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        fields = (
+            'name', 'text', 'cooking_time', 'tags', 'ingredients', 'author',
+        )
 
     def filter_tags(self, queryset, name, tags):
         filter_tags = dict(self.data)['tags']
-        return queryset.filter(tags__slug__in=filter_tags).distinct()
+        return queryset.filter(
+            id__in=Recipe.tags.through.objects.filter(
+                tag__slug__in=filter_tags
+            ).values('recipe_id')
+        )
 
     @property
     def qs(self):
         queryset = super().qs
         user = getattr(self.request, 'user', None)
         is_favorited = self.request.GET.get('is_favorited')
-        if is_favorited:
-            queryset = queryset.filter(users=user)
+        if is_favorited in ('1', 'true'):
+            if not user.is_authenticated:
+                return Recipe.objects.none()
+            queryset = queryset.filter(
+                id__in=User.favorite_recipes.through.objects.filter(
+                    user_id=user.id
+                ).values('recipe_id')
+            )
         is_in_shopping_cart = self.request.GET.get('is_in_shopping_cart')
-        if is_in_shopping_cart:
+        if is_in_shopping_cart in ('1', 'true'):
             if (
                 not user.is_authenticated or
-                not user.shoping_cart
+                not user.shoping_cart_id
             ):
                 return Recipe.objects.none()
-            queryset = queryset.filter(shoping_cart=user.shoping_cart)
+            queryset = queryset.filter(
+                id__in=Recipe.shoping_cart.through.objects.filter(
+                    shopingcart_id=user.shoping_cart_id
+                ).values('recipe_id')
+            )
         return queryset
@@ -1,6 +1,211 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import (
+    EmptyResultSet, FieldDoesNotExist, ValidationError
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def cached_count(queryset):
+    """COUNT(*), закэшированный по тексту запроса вместе с параметрами."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'pagination-count:' + sha256(
+        repr((queryset.db, sql, params)).encode()
+    ).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset):
+    """Оценка из pg_class.reltuples для запросов без фильтров."""
+    connection = connections[queryset.db]
+    if queryset.query.where or connection.vendor != 'postgresql':
+        return cached_count(queryset)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if not row or row[0] <= 0:
+        return cached_count(queryset)
+    return row[0]
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """Постраничная выдача; с параметром ?cursor= — по ключу без COUNT(*).
+
+    Курсор хранит значения полей сортировки последнего объекта страницы,
+    следующая страница выбирается условием по (поле сортировки, id).
+
+    Способ подсчета общего количества задается атрибутом count_strategy
+    вьюсета: exact — COUNT(*) на каждый запрос, cached — COUNT(*) из
+    кэша по тексту запроса, estimate — оценка Postgres для запросов без
+    фильтров (иначе cached), has_next — без подсчета. Кроме exact, ссылки
+    на страницы строятся по лишней строке: приблизительный count не
+    должен прятать существующие страницы.
+    """
+
     page_size = 6
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_functions = {
+        'cached': cached_count,
+        'estimate': estimated_count,
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        self.count_strategy = getattr(view, 'count_strategy', 'exact')
+        if not self.cursor_mode:
+            if self.count_strategy == 'has_next':
+                self.count = None
+                return self.paginate_queryset_without_count(queryset, request)
+            if self.count_strategy in self.count_functions:
+                self.count = self.count_functions[self.count_strategy](
+                    queryset
+                )
+                return self.paginate_queryset_without_count(queryset, request)
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(
+                queryset.model, ordering, self.decode_cursor(cursor)
+            ))
+        page = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            last = page[-1]
+            self.next_cursor = self.encode_cursor([
+                getattr(last, field.lstrip('-')) for field in ordering
+            ])
+        return page
+
+    def paginate_queryset_without_count(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except ValueError:
+            raise NotFound('Неверная страница.')
+        if self.page_number < 1:
+            raise NotFound('Неверная страница.')
+        offset = (self.page_number - 1) * page_size
+        page = list(queryset[offset:offset + page_size + 1])
+        self.has_next_page = len(page) > page_size
+        return page[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode and self.count_strategy != 'exact':
+            url = self.request.build_absolute_uri()
+            next_link = previous_link = None
+            if self.has_next_page:
+                next_link = replace_query_param(
+                    url, self.page_query_param, self.page_number + 1
+                )
+            if self.page_number == 2:
+                previous_link = remove_query_param(url, self.page_query_param)
+            elif self.page_number > 2:
+                previous_link = replace_query_param(
+                    url, self.page_query_param, self.page_number - 1
+                )
+            return Response(OrderedDict([
+                ('count', self.count),
+                ('next', next_link),
+                ('previous', previous_link),
+                ('results', data),
+            ]))
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_cursor_link()),
+            ('results', data),
+        ]))
+
+    def get_next_cursor_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor
+        )
+
+    def get_ordering(self, queryset):
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def keyset_filter(self, model, ordering, values):
+        if len(values) != len(ordering):
+            raise NotFound('Неверный курсор.')
+        try:
+            values = [
+                self.get_ordering_field(model, field).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+            keyset = Q()
+            for position, field in enumerate(ordering):
+                lookup = 'lt' if field.startswith('-') else 'gt'
+                condition = Q(
+                    **{f'{field.lstrip("-")}__{lookup}': values[position]}
+                )
+                for previous, value in zip(ordering[:position], values):
+                    condition &= Q(**{previous.lstrip('-'): value})
+                keyset |= condition
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            raise NotFound('Неверный курсор.')
+        return keyset
+
+    def get_ordering_field(self, model, field):
+        name = field.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk
+        return model._meta.get_field(name)
+
+    def encode_cursor(self, values):
+        # DjangoJSONEncoder обрезает время до миллисекунд, а курсору нужна
+        # полная точность, иначе строки на границе страниц повторяются.
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ]
+        return base64.urlsafe_b64encode(
+            json.dumps(values, cls=DjangoJSONEncoder).encode()
+        ).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (TypeError, ValueError):
+            raise NotFound('Неверный курсор.')
+        if not isinstance(values, list):
+            raise NotFound('Неверный курсор.')
+        return values
@@ -0,0 +1,71 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Реплика, выбранная для текущего запроса, или None — читать с primary.
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def _sticky_key(user):
+    return f'replication:primary:{user.pk}'
+
+
+def stick_to_primary(user):
+    """После записи пользователь какое-то время читает с primary."""
+    if user.is_authenticated:
+        caches['replication'].set(
+            _sticky_key(user), True, settings.DATABASE_REPLICA_STICKY_SECONDS
+        )
+
+
+def choose_replica(user):
+    if not settings.DATABASE_REPLICAS:
+        return None
+    if user.is_authenticated and caches['replication'].get(_sticky_key(user)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """Чтение — с реплики, выбранной ReplicaReadMixin, запись — в primary."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaReadMixin:
+    """Отправляет list/retrieve на реплику, если пользователь недавно не писал.
+
+    Все запросы одного ответа идут на одну реплику.
+    """
+
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+        ):
+            self._read_alias_token = _read_alias.set(
+                choose_replica(request.user)
+            )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            stick_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
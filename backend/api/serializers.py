@@ -1,18 +1,56 @@
+import base64
+import binascii
 import re
 
 from hashlib import sha256
+from uuid import uuid4
 
+from django.core.files.base import ContentFile
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.hashers import check_password
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Prefetch
 
 from users.models import User
 from recipes.models import (
     Tag, Recipe, Ingredient, IngredientAmount,
     ShopingCart
 )
+from recipes.counters import add_link, remove_link
+from recipes.thumbnails import thumbnail_urls
+from .authentication import forget_user
+from .services import bump_cart_version, get_requested_fields
+
+
+class SparseFieldsMixin:
+    """Оставляет только поля, перечисленные в параметре ?fields=."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = get_requested_fields(self.context.get('request'))
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class Base64ImageField(serializers.ImageField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            try:
+                header, content = data.split(';base64,', 1)
+                content = base64.b64decode(content, validate=True)
+            except (binascii.Error, ValueError):
+                raise serializers.ValidationError(
+                    'Изображение должно быть в формате data:image/...;base64.'
+                )
+            extension = header.split('/')[-1]
+            data = ContentFile(content, name=f'{uuid4().hex}.{extension}')
+        return super().to_internal_value(data)
+
+    def to_representation(self, value):
+        return value.url if value else None
 
 
 class RegistrationSerializer(serializers.Serializer):
@@ -77,6 +115,9 @@ class UserSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         if not self.context['request'].user.is_authenticated:
             return False
+        viewer_state = self.context.get('viewer_state')
+        if viewer_state is not None:
+            return obj.id in viewer_state['subscriptions']
         return User.objects.filter(
             id=self.context['request'].user.id,
             subscriptions=obj
@@ -90,30 +131,37 @@ class UserSubscribeSerializer(UserSerializer):
             User, 
             pk=self.initial_data['pk']
         )
-        subscriptions = user.subscriptions.filter(
-            pk=subscribe.pk
-        ).exists()
+        followers = User.objects.filter(pk=subscribe.pk)
         if self.context['request'].method == 'DELETE':
-            if subscriptions:
-                user.subscriptions.remove(subscribe)
+            if remove_link(
+                User.subscriptions.through, followers, 'followers_count',
+                from_user=user, to_user=subscribe
+            ):
                 return {'deleted': True}
             else:
                 raise serializers.ValidationError(
                     'Вы не подписаны на этого пользователя.'
                 )
-        if not subscriptions:
-            if subscribe != user:
-                user.subscriptions.add(subscribe)
-            else:
-                raise serializers.ValidationError(
+        if subscribe == user:
+            raise serializers.ValidationError(
                 'Нельзя подписаться на себя.'
-                )
-        else:
+            )
+        if not add_link(
+            User.subscriptions.through, followers, 'followers_count',
+            from_user=user, to_user=subscribe
+        ):
             raise serializers.ValidationError(
                 'Вы уже подписаны на этого пользователя.'
             )
         recipes_subscribe = Recipe.objects.filter(
                 author=subscribe
+        ).prefetch_related(
+            Prefetch(
+                'ingredientamount_set',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
+            )
         )
         recipes = RecipeReadSerializer(
             recipes_subscribe,
@@ -136,6 +184,7 @@ class RoleSerializer(serializers.ModelSerializer):
 
     class Meta:
         fields = '__all__'
+        read_only_fields = User.counter_fields
         model = User
 
     def validate(self, data):
@@ -167,22 +216,25 @@ class ChangePasswordSerializer(serializers.Serializer):
 class Recipes(serializers.Field):
 
     def to_representation(self, value):
+        recipes = getattr(value, 'page_recipes', None)
+        if recipes is None:
+            recipes = value.recipes.only(
+                'id', 'name', 'image', 'cooking_time', 'author'
+            )
         return [
             {
                 'id': i.id,
                 'name': i.name,
-                'image': i.image,
+                'image': i.image.url if i.image else None,
                 'cooking_time': i.cooking_time
-            } for i in value.recipes.all()
+            } for i in recipes
         ]
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     is_subscribed = serializers.BooleanField(source='subscriptions')
     recipes = Recipes(source='*')
-    recipes_count = serializers.IntegerField(
-        source='recipes.count'
-    )
+    recipes_count = serializers.IntegerField()
 
     class Meta:
         fields = (
@@ -217,22 +269,19 @@ class TagSerializer(serializers.ModelSerializer):
         return data
 
 class IngredientSerializer(serializers.ModelSerializer):
-    amount = {}
 
     class Meta:
         fields = '__all__'
         model = Ingredient
 
     def to_representation(self, data):
-        try:
-            ingredient_amount = self.amount[data.id]
-        except KeyError:
-            ingredient_amount = 0
+        # Принимает как Ingredient, так и IngredientAmount рецепта.
+        ingredient = getattr(data, 'ingredient', data)
         return {
-                'id': data.id,
-                'name': data.name,
-                'measurement_unit': data.measurement_unit,
-                'amount': ingredient_amount
+                'id': ingredient.id,
+                'name': ingredient.name,
+                'measurement_unit': ingredient.measurement_unit,
+                'amount': getattr(data, 'amount', 0)
         }
 
     def to_internal_value(self, data):
@@ -240,27 +289,40 @@ class IngredientSerializer(serializers.ModelSerializer):
         #     raise serializers.ValidationError(
         #         'Количество должно быть положительным.'
         #     )
-        ingredient_amount = {
-            'amount': data['amount'],
-            'ingredient': Ingredient.objects.get(id=data['id'])
-        }
-        self.amount.update({data['id']: data['amount']})
+        # Сами ингредиенты достаются одним запросом в
+        # RecipeWriteSerializer.validate_ingredients.
+        try:
+            ingredient_amount = {
+                'amount': data['amount'],
+                'id': data['id']
+            }
+        except (KeyError, TypeError):
+            raise serializers.ValidationError(
+                'У ингредиента должны быть поля id и amount.'
+            )
         return ingredient_amount
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True)
     author = UserSerializer(required=False)
+    image = Base64ImageField(required=False)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     
     class Meta:
-        fields = '__all__'
+        fields = (
+            'id', 'tags', 'author', 'image', 'is_favorited',
+            'is_in_shopping_cart', 'ingredients', 'name', 'text',
+            'cooking_time',
+        )
         model = Recipe
 
     def get_is_favorited(self, obj):
         if not self.context['request'].user.is_authenticated:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return User.objects.filter(
             id=self.context['request'].user.id,
             favorite_recipes=obj
@@ -269,6 +331,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         if not self.context['request'].user.is_authenticated:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         try:            
             return Recipe.objects.filter(
                 id=obj.id,
@@ -279,72 +343,101 @@ class RecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeWriteSerializer(RecipeSerializer):
-    ingredients = IngredientSerializer(many=True)
+    ingredients = IngredientSerializer(many=True, write_only=True)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['ingredients'] = IngredientSerializer(
+            instance.ingredientamount_set.select_related('ingredient'),
+            many=True
+        ).data
+        return data
 
-    def _create_amount(self, obj, data):
-        amounts = IngredientAmount.objects.filter(
-            recipe=obj
-        ).delete()
-        amount_objs = [
-            IngredientAmount(
-                ingredient=ingredient['ingredient'],
-                amount=ingredient['amount'],
-                recipe=obj
-            )
-            for ingredient in data.get('ingredients')
-        ]
-        amounts = IngredientAmount.objects.bulk_create(amount_objs)
-    
-    def create(self, data):
-        ingredients = [i['ingredient'] for i in self.validated_data.get('ingredients')]
-        amounts = [int(i['amount']) for i in self.validated_data.get('ingredients')]
-        for amount in amounts:
-            if amount < 0:
+    def validate_ingredients(self, value):
+        for item in value:
+            try:
+                item['id'] = int(item['id'])
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(
+                    f'Неверный id ингредиента: {item["id"]}.'
+                )
+            try:
+                item['amount'] = float(item['amount'])
+            except (TypeError, ValueError):
+                raise serializers.ValidationError(
+                    'Количество должно быть числом.'
+                )
+            if item['amount'] < 0:
                 raise serializers.ValidationError(
                     'Количество должно быть положительным.'
                 )
-        if (
-            len(ingredients) > 1 
-            and len(ingredients) != len(set(ingredients))
-        ):
+        ingredients = Ingredient.objects.in_bulk(
+            [item['id'] for item in value]
+        )
+        for item in value:
+            try:
+                item['ingredient'] = ingredients[item['id']]
+            except KeyError:
+                raise serializers.ValidationError(
+                    f'Ингредиент {item["id"]} не найден.'
+                )
+        ids = [item['ingredient'].id for item in value]
+        if len(ids) != len(set(ids)):
             raise serializers.ValidationError(
                 'Есть повторяющиеся ингредиенты.'
             )
+        return value
+
+    def _create_amount(self, obj, data):
+        """Записывает только изменившиеся количества ингредиентов."""
+        existing = {
+            amount.ingredient_id: amount
+            for amount in IngredientAmount.objects.filter(recipe=obj)
+        }
+        created, changed = [], []
+        for item in data.get('ingredients'):
+            amount = existing.pop(item['ingredient'].id, None)
+            if amount is None:
+                created.append(IngredientAmount(
+                    ingredient=item['ingredient'],
+                    amount=item['amount'],
+                    recipe=obj
+                ))
+            elif amount.amount != item['amount']:
+                amount.amount = item['amount']
+                changed.append(amount)
+        if existing:
+            IngredientAmount.objects.filter(
+                pk__in=[amount.pk for amount in existing.values()]
+            ).delete()
+        if created:
+            IngredientAmount.objects.bulk_create(created)
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ['amount'])
+
+    @transaction.atomic
+    def create(self, data):
         recipe = Recipe.objects.create(
             author=self.context['request'].user,
             cooking_time=self.validated_data.get('cooking_time'),
             text=self.validated_data.get('text'),
             name=self.validated_data.get('name'),
             image=self.validated_data.get('image'),
-        )        
-        recipe.ingredients.set(ingredients)
+        )
         recipe.tags.set(self.validated_data.get('tags'))
         self._create_amount(recipe, self.validated_data)
         return recipe
 
+    @transaction.atomic
     def update(self, obj, data):
-        ingredients = [i['ingredient'] for i in self.validated_data.get('ingredients')]
-        amounts = [int(i['amount']) for i in self.validated_data.get('ingredients')]
-        for amount in amounts:
-            if amount < 0:
-                raise serializers.ValidationError(
-                    'Количество должно быть положительным.'
-                )
-        if (
-            len(ingredients) > 1 
-            and len(ingredients) != len(set(ingredients))
-        ):
-            raise serializers.ValidationError(
-                'Есть повторяющиеся ингредиенты.'
-            )
         obj.cooking_time = self.validated_data.get('cooking_time')
         obj.text = self.validated_data.get('text', obj.text)
         obj.name = self.validated_data.get('name', obj.name)
         obj.image = self.validated_data.get('image', obj.image)
-        obj.ingredients.set(ingredients)
         obj.tags.set(self.validated_data.get('tags'))
         self._create_amount(obj, self.validated_data)
-        obj.save()
+        bump_cart_version(ShopingCart.objects.filter(recipes=obj))
+        obj.save(update_fields=['name', 'text', 'cooking_time', 'image'])
         return obj
 
     def validate(self, data):
@@ -363,13 +456,16 @@ class RecipeWriteSerializer(RecipeSerializer):
 
     def get_is_favorited(self, obj):
         try:
-            self.context['request'].user.favorite_recipes.add(obj)
+            add_link(
+                User.favorite_recipes.through,
+                Recipe.objects.filter(pk=obj.pk), 'favorites_count',
+                user=self.context['request'].user, recipe=obj
+            )
             return True
         except:
             return False
 
     def get_is_in_shopping_cart(self, obj):
-        print(obj)
         try:
             shoping_cart = ShopingCart.objects.get(
                 user=self.context['request'].user
@@ -377,25 +473,37 @@ class RecipeWriteSerializer(RecipeSerializer):
         except ShopingCart.DoesNotExist:
             shoping_cart = ShopingCart.objects.create()
             shoping_cart.user.add(self.context['request'].user)
+            forget_user(self.context['request'].user.pk)
         finally:
-            shoping_cart.recipes.add(obj)
+            if add_link(
+                ShopingCart.recipes.through,
+                Recipe.objects.filter(pk=obj.pk), 'cart_count',
+                shopingcart=shoping_cart, recipe=obj
+            ):
+                bump_cart_version(
+                    ShopingCart.objects.filter(pk=shoping_cart.pk)
+                )
         return True
 
 
-class RecipeReadSerializer(RecipeSerializer):
+class RecipeReadSerializer(SparseFieldsMixin, RecipeSerializer):
     ingredients = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('thumbnails',)
+
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj.image)
 
     def get_ingredients(self, obj):
-        ingredients = obj.ingredients.all()
+        amounts = obj.ingredientamount_set.all()
         return [{
-                'id': i.id,
-                'name': i.name,
-                'measurement_unit': i.measurement_unit,
-                'amount': IngredientAmount.objects.get(
-                    recipe=obj.id,
-                    ingredient=i.id
-                ).amount
-        } for i in ingredients]
+                'id': i.ingredient.id,
+                'name': i.ingredient.name,
+                'measurement_unit': i.ingredient.measurement_unit,
+                'amount': i.amount
+        } for i in amounts]
 
 
 class RecipeToShoppingCart(serializers.Serializer):
@@ -411,17 +519,26 @@ class RecipeToShoppingCart(serializers.Serializer):
         except ShopingCart.DoesNotExist:
             shoping_cart = ShopingCart.objects.create()
             shoping_cart.user.add(self.context['request'].user)
+            forget_user(self.context['request'].user.pk)
             
+        link = {'shopingcart': shoping_cart, 'recipe': recipe}
+        counter = Recipe.objects.filter(pk=recipe.pk)
         if self.context['request'].method == 'DELETE':
-            if shoping_cart.recipes.filter(pk=recipe.pk).exists():
-                shoping_cart.recipes.remove(recipe)
+            if remove_link(
+                ShopingCart.recipes.through, counter, 'cart_count', **link
+            ):
+                bump_cart_version(
+                    ShopingCart.objects.filter(pk=shoping_cart.pk)
+                )
                 return {'deleted': True}
             else:
                 raise serializers.ValidationError(
                     'Рецепта нет в списке покупок.'
                 )
-        if not shoping_cart.recipes.filter(pk=recipe.pk).exists():
-            shoping_cart.recipes.add(recipe)
+        if add_link(
+            ShopingCart.recipes.through, counter, 'cart_count', **link
+        ):
+            bump_cart_version(ShopingCart.objects.filter(pk=shoping_cart.pk))
         else:
             raise serializers.ValidationError(
                 'Рецепт уже есть в списке покупок.'
@@ -429,7 +546,7 @@ class RecipeToShoppingCart(serializers.Serializer):
         return {
                 'id': recipe.id,
                 'name': recipe.name,
-                'image': recipe.image,
+                'image': recipe.image.url if recipe.image else None,
                 'cooking_time': recipe.cooking_time,
         }
 
@@ -441,23 +558,27 @@ class RecipeToFavoriteList(serializers.Serializer):
             Recipe, 
             pk=self.initial_data['pk']
         )        
+        counter = Recipe.objects.filter(pk=recipe.pk)
         if self.context['request'].method == 'DELETE':
-            if user.favorite_recipes.filter(pk=recipe.pk).exists():
-                user.favorite_recipes.remove(recipe)
+            if remove_link(
+                User.favorite_recipes.through, counter, 'favorites_count',
+                user=user, recipe=recipe
+            ):
                 return {'deleted': True}
             else:
                 raise serializers.ValidationError(
                     'Рецепта нет в избранном.'
                 )
-        if not user.favorite_recipes.filter(pk=recipe.pk).exists():
-            user.favorite_recipes.add(recipe)
-        else:
+        if not add_link(
+            User.favorite_recipes.through, counter, 'favorites_count',
+            user=user, recipe=recipe
+        ):
             raise serializers.ValidationError(
                 'Рецепт уже есть в избранном.'
             )
         return {
                 'id': recipe.id,
                 'name': recipe.name,
-                'image': recipe.image,
+                'image': recipe.image.url if recipe.image else None,
                 'cooking_time': recipe.cooking_time,
         }
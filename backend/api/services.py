@@ -1,18 +1,165 @@
-from django.db.models import Sum, Count, Subquery, OuterRef
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import (
+    F, Sum, Count, Subquery, OuterRef, Exists, Value, BooleanField,
+    Prefetch, prefetch_related_objects
+)
 
-from recipes.models import Ingredient, IngredientAmount
+from recipes.models import Tag, IngredientAmount, Recipe, ShopingCart
+from users.models import User
 
 
-def get_file(shopping_cart):
-    ingredients = Ingredient.objects.filter(
-        recipes__in=shopping_cart.recipes.all()
+def bump_cart_version(carts):
+    """Сбрасывает закэшированные списки покупок переданных корзин."""
+    carts.update(version=F('version') + 1)
+
+
+def get_shopping_list(shopping_cart):
+    """Суммы ингредиентов корзины, закэшированные до изменения корзины.
+
+    Строки отдаются по мере чтения из базы. В кэш попадают только списки
+    не длиннее SHOPPING_LIST_CACHE_MAX_ROWS: MAX_ENTRIES ограничивает
+    число записей, а не их размер, и длинный список держал бы в памяти
+    и воркер, и кэш.
+    """
+    key = f'shopping-list:{shopping_cart.id}:{shopping_cart.version}'
+    rows = caches['shopping_lists'].get(key)
+    if rows is not None:
+        return iter(rows)
+    return _stream_and_cache(key, IngredientAmount.objects.filter(
+        recipe__shoping_cart=shopping_cart
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
     ).annotate(
-        amount=Sum('recipes__ingredientamount__amount')
-    )
-    with open('shopping-list.txt', 'w') as file:
-        for i in ingredients:
-            file.write(
-                f'{i.name} - {i.amount} {i.measurement_unit}\n'
+        amount=Sum('amount')
+    ).order_by('name', 'measurement_unit'))
+
+
+def _stream_and_cache(key, queryset):
+    limit = settings.SHOPPING_LIST_CACHE_MAX_ROWS
+    buffered = []
+    for row in queryset.iterator():
+        if buffered is not None:
+            buffered.append(row)
+            if len(buffered) > limit:
+                buffered = None
+        yield row
+    if buffered is not None:
+        caches['shopping_lists'].set(key, buffered)
+
+
+def get_viewer_state(user, authors=()):
+    """Подписки пользователя на авторов страницы.
+
+    Избранное и корзина приходят аннотациями из get_recipe_read_queryset.
+    """
+    viewer_state = {'subscriptions': set()}
+    if not user.is_authenticated:
+        return viewer_state
+    author_ids = {author.id for author in authors}
+    if author_ids:
+        viewer_state['subscriptions'] = set(
+            user.subscriptions.filter(
+                id__in=author_ids
+            ).values_list('id', flat=True)
+        )
+    return viewer_state
+
+
+def get_requested_fields(request):
+    """Поля из параметра ?fields=, None если ограничений нет."""
+    fields = request.query_params.get('fields') if request else None
+    if not fields:
+        return None
+    return {'id'} | {field.strip() for field in fields.split(',')}
+
+
+def get_recipe_read_queryset(queryset, user, fields=None):
+    """Связанные объекты и флаги избранного/корзины одним набором запросов.
+
+    Если переданы запрошенные поля, тяжелые колонки и связи, которые не
+    попадут в ответ, не читаются из базы.
+    """
+    def requested(*names):
+        return fields is None or any(name in fields for name in names)
+
+    deferred = [
+        column for column, names in (
+            ('text', ('text',)),
+            ('image', ('image', 'thumbnails')),
+        ) if not requested(*names)
+    ]
+    if deferred:
+        queryset = queryset.defer(*deferred)
+    if requested('author'):
+        queryset = queryset.select_related('author')
+    if requested('tags'):
+        queryset = queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.all())
+        )
+    if requested('ingredients'):
+        queryset = queryset.prefetch_related(
+            Prefetch(
+                'ingredientamount_set',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
             )
-    send_file = open('shopping-list.txt','rb')
-    return send_file
\ No newline at end of file
+        )
+    annotations = {}
+    if requested('is_favorited'):
+        annotations['is_favorited'] = (
+            Exists(
+                User.favorite_recipes.through.objects.filter(
+                    user_id=user.id,
+                    recipe_id=OuterRef('pk')
+                )
+            ) if user.is_authenticated
+            else Value(False, output_field=BooleanField())
+        )
+    if requested('is_in_shopping_cart'):
+        annotations['is_in_shopping_cart'] = (
+            Exists(
+                Recipe.shoping_cart.through.objects.filter(
+                    shopingcart_id=user.shoping_cart_id,
+                    recipe_id=OuterRef('pk')
+                )
+            ) if user.is_authenticated
+            else Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(**annotations)
+
+
+def get_subscription_queryset(queryset, fields=None):
+    """Авторы ленты подписок только с колонками, попадающими в ответ."""
+    if fields is None:
+        return queryset
+    return queryset.only(*fields & {
+        'id', 'email', 'username', 'first_name', 'last_name',
+        'recipes_count',
+    })
+
+
+def prefetch_author_recipes(authors, limit=None):
+    """Рецепты авторов страницы одним запросом, не больше limit на автора."""
+    recipes = Recipe.objects.only(
+        'id', 'name', 'image', 'cooking_time', 'author'
+    ).order_by('id')
+    if limit is not None and authors:
+        placeholders = ', '.join(['%s'] * len(authors))
+        table = Recipe._meta.db_table
+        recipes = recipes.extra(
+            where=[
+                f'{table}.id IN (SELECT id FROM ('
+                f'SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY author_id ORDER BY id) AS position '
+                f'FROM {table} WHERE author_id IN ({placeholders})'
+                f') AS ranked WHERE position <= %s)'
+            ],
+            params=[author.id for author in authors] + [limit]
+        )
+    prefetch_related_objects(
+        authors,
+        Prefetch('recipes', queryset=recipes, to_attr='page_recipes')
+    )
@@ -0,0 +1,92 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient, IngredientAmount, Recipe, ShopingCart, Tag
+)
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+
+@pytest.fixture
+def user(db):
+    user = User.objects.create(username='cook', email='cook@example.com')
+    user.set_password('secret-password')
+    user.save()
+    return user
+
+
+@pytest.fixture
+def author(db):
+    return User.objects.create(username='author', email='author@example.com')
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key
+    )
+    return client
+
+
+@pytest.fixture
+def anon_client():
+    return APIClient()
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=f'Тег {i}', color='#ffffff', slug=f'tag-{i}')
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    Ingredient.objects.bulk_create([
+        Ingredient(name=f'Ингредиент {i:02}', measurement_unit='г')
+        for i in range(40)
+    ])
+    return list(Ingredient.objects.order_by('id'))
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    def make_recipes(count, ingredient_count=12, **fields):
+        fields.setdefault('author', author)
+        recipes = []
+        for _ in range(count):
+            number = Recipe.objects.count()
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Текст',
+                cooking_time=number % 60 + 1, **fields
+            )
+            recipe.tags.set(tags[:2])
+            IngredientAmount.objects.bulk_create([
+                IngredientAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=index + 1)
+                for index, ingredient in enumerate(
+                    Ingredient.objects.all()[:ingredient_count]
+                )
+            ])
+            recipes.append(recipe)
+        return recipes
+    return make_recipes
+
+
+@pytest.fixture
+def cart(user):
+    cart = ShopingCart.objects.create()
+    user.shoping_cart = cart
+    user.save()
+    return cart
@@ -0,0 +1,83 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from api.authentication import CACHED_USER_FIELDS, _user_key
+from api.checks import check_shared_caches
+from users.models import User
+
+
+@pytest.mark.django_db
+def test_cached_token_skips_database(client, tags, django_assert_num_queries):
+    client.get('/api/tags/')
+    with django_assert_num_queries(0):
+        assert client.get('/api/tags/').status_code == 200
+
+
+@pytest.mark.django_db
+def test_cache_keeps_only_auth_fields(client, user, tags):
+    client.get('/api/tags/')
+    cached = caches['auth_tokens'].get(_user_key(user.pk))
+    assert set(cached) == set(CACHED_USER_FIELDS)
+    assert 'password' not in cached
+
+
+@pytest.mark.django_db
+def test_logout_revokes_cached_token(client, tags):
+    assert client.get('/api/tags/').status_code == 200
+    assert client.post('/api/auth/token/logout/').status_code == 204
+    assert client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_unknown_token_is_cached_as_invalid(tags, django_assert_num_queries):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token unknown')
+    assert client.get('/api/tags/').status_code == 401
+    with django_assert_num_queries(0):
+        assert client.get('/api/tags/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_deactivated_user_is_rejected(client, user, tags):
+    client.get('/api/tags/')
+    user.is_active = False
+    user.save()
+    assert client.get('/api/tags/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_cached_user_save_keeps_other_columns(client, user, tags):
+    User.objects.filter(pk=user.pk).update(recipes_count=7)
+    client.get('/api/tags/')
+    response = client.post('/api/users/set_password/', {
+        'current_password': 'secret-password',
+        'new_password': 'other-password',
+    }, format='json')
+    assert response.status_code == 201
+    user.refresh_from_db()
+    assert user.check_password('other-password')
+    assert user.recipes_count == 7
+    assert user.email == 'cook@example.com'
+
+
+@pytest.mark.django_db
+def test_new_cart_is_visible_to_cached_user(client, make_recipes):
+    recipe, = make_recipes(1, ingredient_count=2)
+    client.get('/api/tags/')
+    download = '/api/recipes/download_shopping_cart/'
+    assert client.get(download).status_code == 404
+    response = client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert response.status_code == 201
+    assert client.get(download).status_code == 200
+
+
+def test_process_local_token_cache_is_reported(settings):
+    settings.CACHES = {**settings.CACHES, 'auth_tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    assert [error.id for error in check_shared_caches(None)] == ['api.W001']
+    settings.CACHES = {**settings.CACHES, 'auth_tokens': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    }}
+    assert check_shared_caches(None) == []
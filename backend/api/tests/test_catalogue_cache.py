@@ -0,0 +1,54 @@
+import time
+
+import pytest
+from django.core.cache import caches
+
+from api.cache import _version_key
+from recipes.models import Tag
+
+
+@pytest.mark.django_db
+def test_not_modified_without_database(
+    anon_client, tags, django_assert_num_queries
+):
+    response = anon_client.get('/api/tags/')
+    etag = response['ETag']
+    assert response['Last-Modified']
+    with django_assert_num_queries(0):
+        response = anon_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_signal_changes_etag(anon_client, tags):
+    etag = anon_client.get('/api/tags/')['ETag']
+    time.sleep(0.01)
+    tags[0].name = 'Новое имя'
+    tags[0].save()
+    response = anon_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()[0]['name'] == 'Новое имя'
+
+
+@pytest.mark.django_db
+def test_missed_signal_expires_with_data(anon_client, tags):
+    etag = anon_client.get('/api/tags/')['ETag']
+    # Изменение в другом воркере: сигнал до этого кэша не дошел.
+    Tag.objects.filter(pk=tags[0].pk).update(name='Чужая правка')
+    response = anon_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    # Истечение TIMEOUT: версия пропадает из кэша.
+    caches['catalogue'].delete(_version_key(Tag))
+    response = anon_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()[0]['name'] == 'Чужая правка'
+
+
+@pytest.mark.django_db
+def test_ingredient_list_uses_same_cache(anon_client, ingredients):
+    response = anon_client.get('/api/ingredients/?name=Ингр')
+    response = anon_client.get(
+        '/api/ingredients/?name=Ингр', HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert response.status_code == 304
@@ -0,0 +1,186 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.counters import add_link, shift_counter
+from recipes.models import Recipe
+from users.models import User
+
+HIDDEN_FIELDS = {'favorites_count', 'cart_count', 'created'}
+
+
+def counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.cart_count
+
+
+@pytest.fixture
+def recipe(make_recipes):
+    recipe, = make_recipes(1, ingredient_count=1)
+    return recipe
+
+
+@pytest.mark.django_db
+def test_counters_are_not_in_responses(client, recipe):
+    listed = client.get('/api/recipes/').json()['results'][0]
+    detail = client.get(f'/api/recipes/{recipe.id}/').json()
+    assert not HIDDEN_FIELDS & set(listed)
+    assert not HIDDEN_FIELDS & set(detail)
+
+
+@pytest.mark.django_db
+def test_write_response_has_no_counters(client, tags, ingredients):
+    response = client.post('/api/recipes/', {
+        'name': 'Суп', 'text': 'Варить', 'cooking_time': 5,
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 1}],
+    }, format='json')
+    assert response.status_code == 201
+    assert not HIDDEN_FIELDS & set(response.json())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('param', ['favorites_count', 'cart_count', 'created'])
+def test_counters_are_not_filters(client, make_recipes, param):
+    make_recipes(3, ingredient_count=1)
+    response = client.get(f'/api/recipes/?{param}=5')
+    assert response.json()['count'] == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('action, index', [
+    ('favorite', 0), ('shopping_cart', 1),
+])
+def test_repeated_toggle_keeps_counter(client, recipe, action, index):
+    url = f'/api/recipes/{recipe.id}/{action}/'
+    assert client.post(url).status_code == 201
+    assert client.post(url).status_code == 400
+    assert counters(recipe)[index] == 1
+    assert client.delete(url).status_code == 204
+    assert client.delete(url).status_code == 400
+    assert counters(recipe)[index] == 0
+
+
+@pytest.mark.django_db
+def test_subscription_counter(client, user, author):
+    url = f'/api/users/{author.id}/subscribe/'
+    assert client.post(url).status_code == 201
+    assert client.post(url).status_code == 400
+    author.refresh_from_db()
+    assert author.followers_count == 1
+    assert client.delete(url).status_code == 204
+    author.refresh_from_db()
+    assert author.followers_count == 0
+
+
+@pytest.mark.django_db
+def test_existing_link_is_not_counted(user, recipe):
+    """Строка, вставленная параллельным запросом, не увеличивает счетчик."""
+    User.favorite_recipes.through.objects.create(user=user, recipe=recipe)
+    assert not add_link(
+        User.favorite_recipes.through,
+        Recipe.objects.filter(pk=recipe.pk), 'favorites_count',
+        user=user, recipe=recipe
+    )
+    assert counters(recipe) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_recipe_edit_does_not_recount_own_links(client, tags, ingredients):
+    body = {
+        'name': 'Суп', 'text': 'Варить', 'cooking_time': 5,
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 1}],
+    }
+    recipe_id = client.post('/api/recipes/', body, format='json').json()['id']
+    client.put(f'/api/recipes/{recipe_id}/', body, format='json')
+    assert counters(Recipe.objects.get(pk=recipe_id)) == (1, 1)
+
+
+def counter_writes(queries, table, fields):
+    """UPDATE, которые присваивают счетчику значение, а не F()-выражение."""
+    assignment = re.compile(
+        r'"(%s)" = (?!\()' % '|'.join(fields)
+    )
+    return [
+        query['sql'] for query in queries.captured_queries
+        if query['sql'].startswith(f'UPDATE "{table}"')
+        and assignment.search(query['sql'])
+    ]
+
+
+@pytest.mark.django_db
+def test_recipe_edit_does_not_write_counters(client, user, tags, ingredients):
+    recipe = Recipe.objects.create(
+        name='Суп', text='Варить', cooking_time=5, author=user
+    )
+    with CaptureQueriesContext(connection) as queries:
+        response = client.put(f'/api/recipes/{recipe.id}/', {
+            'name': 'Суп', 'text': 'Долго варить', 'cooking_time': 5,
+            'tags': [tags[0].id],
+            'ingredients': [{'id': ingredients[0].id, 'amount': 1}],
+        }, format='json')
+    assert response.status_code == 200
+    assert not counter_writes(
+        queries, 'recipes_recipe', Recipe.counter_fields
+    )
+
+
+@pytest.mark.django_db
+def test_user_saves_do_not_write_counters(client, user):
+    with CaptureQueriesContext(connection) as queries:
+        client.post('/api/users/set_password/', {
+            'current_password': 'secret-password',
+            'new_password': 'other-password',
+        }, format='json')
+        response = client.patch(
+            '/api/users/me/', {'first_name': 'Иван', 'recipes_count': 99},
+            format='json'
+        )
+    assert response.status_code == 200
+    assert not counter_writes(queries, 'users_user', User.counter_fields)
+    user.refresh_from_db()
+    assert (user.first_name, user.recipes_count) == ('Иван', 0)
+
+
+@pytest.mark.django_db
+def test_stale_instance_save_keeps_counters(user, recipe):
+    stale = Recipe.objects.get(pk=recipe.pk)
+    shift_counter(Recipe.objects.filter(pk=recipe.pk), 'favorites_count', 1)
+    stale.name = 'Новое имя'
+    stale.save()
+    assert counters(recipe) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_recipes_count_follows_orm_changes(client, user, author, recipe):
+    Recipe.objects.create(name='Еще', text='Текст', cooking_time=1,
+                          author=author)
+    author.refresh_from_db()
+    assert author.recipes_count == 2
+    recipe.delete()
+    author.refresh_from_db()
+    assert author.recipes_count == 1
+    user.subscriptions.add(author)
+    feed = client.get('/api/users/subscriptions/').json()['results']
+    assert feed[0]['recipes_count'] == 1
+
+
+@pytest.mark.django_db
+def test_user_deletion_releases_counters(user, author, recipe):
+    add_link(
+        User.favorite_recipes.through,
+        Recipe.objects.filter(pk=recipe.pk), 'favorites_count',
+        user=user, recipe=recipe
+    )
+    add_link(
+        User.subscriptions.through,
+        User.objects.filter(pk=author.pk), 'followers_count',
+        from_user=user, to_user=author
+    )
+    user.delete()
+    author.refresh_from_db()
+    assert counters(recipe) == (0, 0)
+    assert author.followers_count == 0
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import re
+
+import pytest
+
+from api.exports import SHOPPING_LIST_RENDERERS, PdfRenderer
+
+ROWS = [
+    {'name': 'Мука', 'amount': 500, 'measurement_unit': 'г'},
+    {'name': 'Соль (морская)', 'amount': 5, 'measurement_unit': 'г'},
+]
+
+
+def render(format, rows=ROWS):
+    chunks = list(SHOPPING_LIST_RENDERERS[format].render(iter(rows)))
+    if format == 'pdf':
+        return b''.join(chunks)
+    return ''.join(chunks)
+
+
+def pdf_rows(count):
+    return [
+        {'name': f'Ингредиент {i}', 'amount': i, 'measurement_unit': 'г'}
+        for i in range(count)
+    ]
+
+
+def test_text_has_line_per_ingredient():
+    assert render('txt') == 'Мука - 500 г\nСоль (морская) - 5 г\n'
+
+
+def test_csv_has_header_and_rows():
+    assert list(csv.reader(io.StringIO(render('csv')))) == [
+        ['Ингредиент', 'Количество', 'Единица измерения'],
+        ['Мука', '500', 'г'],
+        ['Соль (морская)', '5', 'г'],
+    ]
+
+
+@pytest.mark.parametrize('rows', [[], ROWS])
+def test_json_is_array_of_rows(rows):
+    assert json.loads(render('json', rows)) == rows
+
+
+def test_pdf_header_and_escaped_text():
+    data = render('pdf')
+    assert data.startswith(b'%PDF-1.4\n')
+    assert data.endswith(b'%%EOF\n')
+    line = 'Соль \\(морская\\) - 5 г'.encode('cp1251')
+    assert b'(%s) Tj' % line in data
+
+
+@pytest.mark.parametrize('row_count, page_count', [
+    (0, 1),
+    (1, 1),
+    (PdfRenderer.lines_per_page, 1),
+    (PdfRenderer.lines_per_page * 2 + 1, 3),
+])
+def test_pdf_page_count(row_count, page_count):
+    data = render('pdf', pdf_rows(row_count))
+    assert len(re.findall(rb'/Type /Page ', data)) == page_count
+    assert re.search(rb'/Type /Pages /Kids \[.*\] /Count (\d+)', data).group(
+        1
+    ) == str(page_count).encode()
+    assert data.count(b') Tj T*') == row_count
+
+
+def test_pdf_xref_offsets_point_at_objects():
+    data = render('pdf', pdf_rows(PdfRenderer.lines_per_page + 1))
+    startxref = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', data).group(1))
+    assert data[startxref:].startswith(b'xref\n')
+    size = int(re.match(rb'xref\n0 (\d+)\n', data[startxref:]).group(1))
+    entries = re.findall(rb'(\d{10}) (\d{5}) ([fn]) \n', data[startxref:])
+    assert len(entries) == size
+    assert entries[0] == (b'0000000000', b'65535', b'f')
+    for number, (offset, _, _) in enumerate(entries[1:], start=1):
+        assert data[int(offset):].startswith(b'%d 0 obj\n' % number)
+    assert re.search(
+        rb'trailer\n<< /Size %d /Root 1 0 R >>' % size, data
+    )
+    assert data[int(entries[1][0]):].startswith(
+        b'1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>'
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('format', sorted(SHOPPING_LIST_RENDERERS))
+def test_download_uses_renderer_headers(client, cart, format):
+    response = client.get(
+        f'/api/recipes/download_shopping_cart/?format={format}'
+    )
+    renderer = SHOPPING_LIST_RENDERERS[format]
+    assert response.status_code == 200
+    assert response['Content-Type'] == renderer.content_type
+    assert response['Content-Disposition'] == (
+        f'attachment; filename="shopping-list.{renderer.extension}"'
+    )
+
+
+@pytest.mark.django_db
+def test_unknown_format_is_bad_request(client, cart):
+    response = client.get('/api/recipes/download_shopping_cart/?format=xls')
+    assert response.status_code == 400
+    assert response.json() == {'errors': 'Неподдерживаемый формат.'}
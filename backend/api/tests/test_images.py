@@ -0,0 +1,152 @@
+import base64
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from PIL import Image
+
+from recipes.models import Recipe
+from recipes.thumbnails import THUMBNAIL_SIZES, thumbnail_name
+
+BEFORE_MEDIA = [('recipes', '0005_ingredient_unique_name_unit')]
+
+
+def png_data_uri():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def png_file():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'blue').save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue(), name='photo.png')
+
+
+def image_files(name):
+    return [name] + [thumbnail_name(name, size) for size in THUMBNAIL_SIZES]
+
+
+def exist(names):
+    return [default_storage.exists(name) for name in names]
+
+
+def recipe_body(tags, ingredients, image):
+    return {
+        'name': 'Блины', 'text': 'Жарить', 'cooking_time': 20,
+        'tags': [tags[0].id], 'image': image,
+        'ingredients': [{'id': ingredients[0].id, 'amount': 2}],
+    }
+
+
+@pytest.mark.django_db
+def test_base64_image_is_stored_as_file(client, tags, ingredients):
+    response = client.post(
+        '/api/recipes/', recipe_body(tags, ingredients, png_data_uri()),
+        format='json'
+    )
+    assert response.status_code == 201
+    recipe = Recipe.objects.get(pk=response.json()['id'])
+    assert recipe.image.name.startswith('recipes/images/')
+    assert response.json()['image'] == recipe.image.url
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('image', [
+    'data:image/png,iVBORw0KGgo=',
+    'data:image/png;base64,not-base64!!',
+    'data:image/png;base64,abc',
+    'data:image/png;base64,' + base64.b64encode(b'not an image').decode(),
+])
+def test_malformed_image_is_bad_request(client, tags, ingredients, image):
+    response = client.post(
+        '/api/recipes/', recipe_body(tags, ingredients, image), format='json'
+    )
+    assert response.status_code == 400
+    assert 'image' in response.json()
+
+
+@pytest.mark.django_db
+def test_orm_saved_image_gets_thumbnails(make_recipes):
+    """Так сохраняет изображение и админка: без сериализатора."""
+    recipe, = make_recipes(1)
+    recipe.image = png_file()
+    recipe.save()
+    assert all(exist(image_files(recipe.image.name)))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replaced_image_files_are_deleted(client, tags, ingredients):
+    created = client.post(
+        '/api/recipes/', recipe_body(tags, ingredients, png_data_uri()),
+        format='json'
+    ).json()
+    old = Recipe.objects.get(pk=created['id']).image.name
+    response = client.patch(
+        f'/api/recipes/{created["id"]}/',
+        recipe_body(tags, ingredients, png_data_uri()), format='json'
+    )
+    assert response.status_code == 200
+    new = Recipe.objects.get(pk=created['id']).image.name
+    assert new != old
+    assert not any(exist(image_files(old)))
+    assert all(exist(image_files(new)))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_edit_without_image_keeps_files(client, tags, ingredients):
+    created = client.post(
+        '/api/recipes/', recipe_body(tags, ingredients, png_data_uri()),
+        format='json'
+    ).json()
+    recipe = Recipe.objects.get(pk=created['id'])
+    recipe.name = 'Оладьи'
+    recipe.save(update_fields=['name'])
+    recipe.refresh_from_db()
+    recipe.save()
+    assert all(exist(image_files(recipe.image.name)))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deleted_recipe_files_are_deleted(client, tags, ingredients):
+    created = client.post(
+        '/api/recipes/', recipe_body(tags, ingredients, png_data_uri()),
+        format='json'
+    ).json()
+    name = Recipe.objects.get(pk=created['id']).image.name
+    assert client.delete(f'/api/recipes/{created["id"]}/').status_code == 204
+    assert not any(exist(image_files(name)))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_media_migration_reports_skipped_rows(capsys):
+    executor = MigrationExecutor(connection)
+    executor.migrate(BEFORE_MEDIA)
+    apps = executor.loader.project_state(BEFORE_MEDIA).apps
+    author = apps.get_model('users', 'User').objects.create(
+        username='cook', email='cook@example.com'
+    )
+    values = [png_data_uri(), 'https://example.com/photo.png']
+    ids = [
+        apps.get_model('recipes', 'Recipe').objects.create(
+            author=author, name=f'Рецепт {number}', text='Текст',
+            cooking_time=5, image=value
+        ).id
+        for number, value in enumerate(values)
+    ]
+    executor.loader.build_graph()
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+    converted, skipped = (Recipe.objects.get(pk=pk) for pk in ids)
+    assert all(exist(image_files(converted.image.name)))
+    assert not skipped.image
+    assert f'id рецептов: {skipped.id}.' in capsys.readouterr().out
+    with default_storage.open(
+        f'recipes/images/unconverted/{skipped.id}.txt'
+    ) as stored:
+        assert stored.read().decode() == values[1]
@@ -0,0 +1,73 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+
+from recipes.models import Ingredient
+
+INGREDIENTS_JSON = Path(settings.BASE_DIR).parent / 'data' / 'ingredients.json'
+
+
+def names(client, query):
+    response = client.get('/api/ingredients/', {'name': query})
+    assert response.status_code == 200
+    return [ingredient['name'] for ingredient in response.json()]
+
+
+@pytest.fixture
+def catalogue(db):
+    # SQLite сравнивает без учета регистра только латиницу,
+    # поэтому регистр проверяется на латинских названиях.
+    Ingredient.objects.bulk_create([
+        Ingredient(name=name, measurement_unit='г') for name in (
+            'сахарная пудра', 'сахар', 'сахар ванильный', 'соль',
+            'Salt flakes', 'salt', 'sea salt',
+        )
+    ])
+
+
+@pytest.mark.django_db
+def test_prefix_search_is_case_insensitive(anon_client, catalogue):
+    assert set(names(anon_client, 'SAL')) == {'salt', 'Salt flakes'}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query, expected', [
+    ('сахар', ['сахар', 'сахар ванильный', 'сахарная пудра']),
+    # По алфавиту 'Salt flakes' шла бы раньше 'salt'.
+    ('SALT', ['salt', 'Salt flakes']),
+])
+def test_exact_match_comes_first(anon_client, catalogue, query, expected):
+    assert names(anon_client, query) == expected
+
+
+@pytest.mark.django_db
+def test_prefix_search_does_not_match_inside_name(anon_client, catalogue):
+    assert names(anon_client, 'ахар') == []
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_autocomplete_latency(anon_client):
+    Ingredient.objects.bulk_create([
+        Ingredient(**item)
+        for item in json.loads(INGREDIENTS_JSON.read_text(encoding='utf-8'))
+    ])
+    prefixes = sorted({
+        name[:length]
+        for name in Ingredient.objects.values_list('name', flat=True)[:200]
+        for length in (1, 2, 3)
+    })
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        assert names(anon_client, prefix)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(
+        f'\nавтодополнение, {len(prefixes)} префиксов: '
+        f'p50 {timings[len(timings) // 2] * 1000:.1f} мс, '
+        f'p99 {timings[int(len(timings) * 0.99)] * 1000:.1f} мс'
+    )
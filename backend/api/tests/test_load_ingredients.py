@@ -0,0 +1,125 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recipes.management.commands.load_ingredients import iter_json
+from recipes.models import Ingredient
+
+ITEMS = [
+    {'name': 'Мука', 'measurement_unit': 'г'},
+    {'name': 'Молоко', 'measurement_unit': 'мл'},
+    {'name': ' Мука ', 'measurement_unit': 'г '},
+    {'name': 'Мука', 'measurement_unit': 'кг'},
+    {'name': 'Молоко', 'measurement_unit': 'мл'},
+]
+LOADED = [('Молоко', 'мл'), ('Мука', 'г'), ('Мука', 'кг')]
+
+
+def write_json(tmp_path, items, name='ingredients.json'):
+    path = tmp_path / name
+    path.write_text(json.dumps(items, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def write_csv(tmp_path, text, name='ingredients.csv'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def load(path, *args):
+    out = StringIO()
+    call_command('load_ingredients', path, *args, stdout=out)
+    return out.getvalue()
+
+
+def loaded():
+    return list(
+        Ingredient.objects.order_by('name', 'measurement_unit').values_list(
+            'name', 'measurement_unit'
+        )
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('batch_size', ['1000', '2'])
+def test_json_is_loaded_without_duplicates(tmp_path, batch_size):
+    output = load(write_json(tmp_path, ITEMS), '--batch-size', batch_size)
+    assert loaded() == LOADED
+    assert 'Обработано 5 строк, добавлено 3' in output
+
+
+def test_json_objects_span_chunks():
+    rows = iter_json(StringIO(json.dumps(ITEMS)), chunk_size=7)
+    assert list(rows) == [
+        (item['name'].strip(), item['measurement_unit'].strip())
+        for item in ITEMS
+    ]
+
+
+@pytest.mark.django_db
+def test_csv_is_loaded_with_header(tmp_path):
+    path = write_csv(
+        tmp_path,
+        'name,measurement_unit\nМука,г\nМолоко,мл\n Мука ,г\n'
+        '"Мука",кг\n\nМолоко,мл\n'
+    )
+    assert 'добавлено 3' in load(path)
+    assert loaded() == LOADED
+
+
+@pytest.mark.django_db
+def test_format_option_overrides_extension(tmp_path):
+    load(write_json(tmp_path, ITEMS, name='ingredients.txt'),
+         '--format', 'json')
+    assert loaded() == LOADED
+
+
+@pytest.mark.django_db
+def test_reimport_adds_nothing(tmp_path):
+    path = write_json(tmp_path, ITEMS)
+    load(path)
+    ids = list(Ingredient.objects.order_by('id').values_list('id', flat=True))
+    assert 'добавлено 0' in load(path)
+    assert 'добавлено 1' in load(write_csv(tmp_path, 'Мука,г\nСоль,г\n'))
+    assert list(
+        Ingredient.objects.order_by('id').values_list('id', flat=True)
+    )[:len(ids)] == ids
+    assert Ingredient.objects.count() == len(LOADED) + 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('content, message', [
+    ('{"name": "Мука"}', 'JSON-массив'),
+    ('[{"name": "Мука", "measurement_unit": "г"}, {"name": ', 'Некорректный'),
+    ('[{"name": "Мука"}]', 'Элемент 0'),
+    ('[{"name": "Мука", "measurement_unit": "г"}, ["Соль", "г"]]',
+     'Элемент 1'),
+    ('[{"name": 5, "measurement_unit": "г"}]', 'строки'),
+    ('[{"name": " ", "measurement_unit": "г"}]', 'пустое'),
+])
+def test_malformed_json_is_command_error(tmp_path, content, message):
+    path = tmp_path / 'ingredients.json'
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(CommandError, match=message):
+        load(str(path))
+    assert not Ingredient.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('content, message', [
+    ('Мука,г\nСоль\n', 'Строка 2'),
+    ('Мука,г,лишнее\n', 'Строка 1'),
+    ('Мука,\n', 'пустое'),
+])
+def test_malformed_csv_is_command_error(tmp_path, content, message):
+    with pytest.raises(CommandError, match=message):
+        load(write_csv(tmp_path, content))
+    assert not Ingredient.objects.exists()
+
+
+def test_unknown_extension_is_command_error(tmp_path):
+    with pytest.raises(CommandError, match='JSON и CSV'):
+        load(write_csv(tmp_path, 'Мука,г\n', name='ingredients.xml'))
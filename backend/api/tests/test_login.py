@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from django.contrib.auth.hashers import identify_hasher
+
+from users import hashers
+from users.models import User
+
+LOGIN = '/api/auth/token/login/'
+
+
+def login(client, email='cook@example.com', password='secret-password'):
+    return client.post(LOGIN, {'email': email, 'password': password})
+
+
+@pytest.mark.django_db
+def test_login_reuses_token(anon_client, user, django_assert_num_queries):
+    token = login(anon_client).json()['auth_token']
+    with django_assert_num_queries(2):
+        assert login(anon_client).json()['auth_token'] == token
+
+
+@pytest.mark.django_db
+def test_email_is_case_insensitive(anon_client, user):
+    assert login(anon_client, email='COOK@Example.com').status_code == 200
+
+
+@pytest.mark.django_db
+def test_exact_email_match_wins(anon_client, user):
+    twin = User.objects.create(username='twin', email='Cook@example.com')
+    twin.set_password('twin-password')
+    twin.save()
+    response = login(
+        anon_client, email='Cook@example.com', password='twin-password'
+    )
+    assert response.status_code == 200
+    assert login(anon_client).status_code == 200
+
+
+@pytest.mark.django_db
+def test_wrong_credentials(anon_client, user):
+    assert login(anon_client, password='wrong').status_code == 400
+    assert login(anon_client, email='nobody@example.com').status_code == 404
+
+
+@pytest.mark.django_db
+def test_password_is_rehashed_with_new_hasher(anon_client, user, settings):
+    assert identify_hasher(user.password).algorithm == 'md5'
+    settings.PASSWORD_HASHERS = [
+        'users.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+    assert login(anon_client).status_code == 200
+    user.refresh_from_db()
+    assert identify_hasher(user.password).algorithm == 'pbkdf2_sha256'
+    assert login(anon_client).status_code == 200
+
+
+@pytest.mark.django_db
+def test_password_is_rehashed_when_work_factor_changes(
+    anon_client, user, settings, monkeypatch
+):
+    settings.PASSWORD_HASHERS = ['users.hashers.PBKDF2PasswordHasher']
+    monkeypatch.setattr(hashers.PBKDF2PasswordHasher, 'iterations', 1000)
+    user.set_password('secret-password')
+    user.save()
+    monkeypatch.setattr(hashers.PBKDF2PasswordHasher, 'iterations', 2000)
+    assert login(anon_client).status_code == 200
+    user.refresh_from_db()
+    assert user.password.split('$')[1] == '2000'
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+@pytest.mark.parametrize('hasher', [
+    'users.hashers.PBKDF2PasswordHasher',
+    'users.hashers.Argon2PasswordHasher',
+    'users.hashers.BCryptSHA256PasswordHasher',
+])
+def test_login_throughput(anon_client, user, settings, hasher):
+    settings.PASSWORD_HASHERS = [hasher]
+    user.set_password('secret-password')
+    user.save()
+    logins = 20
+    started = time.perf_counter()
+    for _ in range(logins):
+        assert login(anon_client).status_code == 200
+    elapsed = time.perf_counter() - started
+    print(f'\n{hasher.rsplit(".", 1)[-1]}: {logins / elapsed:.1f} входов/с')
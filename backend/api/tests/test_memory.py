@@ -0,0 +1,61 @@
+import gc
+import tracemalloc
+
+import pytest
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeWriteSerializer
+from recipes.models import Ingredient
+
+WARMUP_WRITES = 100
+WRITES = 1000
+# Допустимый прирост памяти за WRITES записей, байт.
+MAX_GROWTH = 32 * 1024
+
+
+def traced_size():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_recipe_writes_do_not_grow_memory(user, tags):
+    """Память процесса не растет с числом сохраненных рецептов.
+
+    Каждая запись использует новые ингредиенты и количества: состояние,
+    накопленное на уровне класса или модуля, росло бы с каждой записью.
+    """
+    Ingredient.objects.bulk_create([
+        Ingredient(name=f'Ингредиент {i:05}', measurement_unit='г')
+        for i in range(2 * (WARMUP_WRITES + WRITES))
+    ])
+    ids = list(Ingredient.objects.order_by('id').values_list('id', flat=True))
+    request = Request(APIRequestFactory().post('/api/recipes/'))
+    request.user = user
+
+    def write(number):
+        serializer = RecipeWriteSerializer(data={
+            'name': f'Рецепт {number}', 'text': 'Текст', 'cooking_time': 5,
+            'tags': [tags[0].id],
+            'ingredients': [
+                {'id': ids[2 * number], 'amount': number + 1},
+                {'id': ids[2 * number + 1], 'amount': number + 2},
+            ],
+        }, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        assert len(serializer.data['ingredients']) == 2
+
+    tracemalloc.start()
+    try:
+        for number in range(WARMUP_WRITES):
+            write(number)
+        before = traced_size()
+        for number in range(WARMUP_WRITES, WARMUP_WRITES + WRITES):
+            write(number)
+        growth = traced_size() - before
+    finally:
+        tracemalloc.stop()
+    assert growth < MAX_GROWTH
@@ -0,0 +1,109 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from api.filters import RecipeFilterBackend
+from api.pagination import CustomPageNumberPagination
+from recipes.models import Recipe
+
+ORDERING_INDEXES = {
+    '-favorites': 'recipe_favorites_id_idx',
+    'favorites': 'recipe_favorites_id_idx',
+    '-created': 'recipe_created_id_idx',
+    'cooking_time': 'recipe_cooking_time_id_idx',
+}
+
+
+def ordered(ordering):
+    request = APIRequestFactory().get('/api/recipes/', {'ordering': ordering})
+    return RecipeFilterBackend(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    ).qs
+
+
+def ids(client, ordering):
+    response = client.get('/api/recipes/', {'ordering': ordering, 'limit': 50})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+@pytest.fixture
+def recipes(make_recipes):
+    recipes = make_recipes(6, ingredient_count=1)
+    now = timezone.now()
+    for index, recipe in enumerate(recipes):
+        Recipe.objects.filter(pk=recipe.pk).update(
+            favorites_count=index % 3,
+            cooking_time=10 - index % 2,
+            created=now - timedelta(days=index // 2),
+        )
+    return [recipe.id for recipe in recipes]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ordering, positions', [
+    ('-favorites', [5, 2, 4, 1, 3, 0]),
+    ('-created', [1, 0, 3, 2, 5, 4]),
+    ('cooking_time', [1, 3, 5, 0, 2, 4]),
+])
+def test_ordering_breaks_ties_by_id(client, recipes, ordering, positions):
+    assert ids(client, ordering) == [recipes[index] for index in positions]
+
+
+@pytest.mark.django_db
+def test_unknown_ordering_is_bad_request(client, recipes):
+    response = client.get('/api/recipes/', {'ordering': 'text'})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ordering, index', ORDERING_INDEXES.items())
+def test_ordering_scans_composite_index(ordering, index):
+    sql, params = ordered(ordering)[600:606].query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = ' '.join(row[-1] for row in cursor.fetchall())
+    assert f'USING INDEX {index}' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_deep_page_latency(client, author):
+    total = 100000
+    now = timezone.now()
+    Recipe.objects.bulk_create([
+        Recipe(
+            name=f'Рецепт {number}', text='Текст', author=author,
+            cooking_time=number % 120 + 1, favorites_count=number % 997,
+            created=now - timedelta(seconds=number),
+        ) for number in range(total)
+    ], batch_size=500)
+    page = total // 6 - 1
+    pagination = CustomPageNumberPagination()
+    for ordering in ORDERING_INDEXES:
+        queryset = ordered(ordering)
+        fields = pagination.get_ordering(queryset)
+        last = queryset[(page - 1) * 6 - 1]
+        cursor = pagination.encode_cursor([
+            getattr(last, field.lstrip('-')) for field in fields
+        ])
+        timings = {}
+        for mode, params in (
+            ('page', {'page': page}), ('cursor', {'cursor': cursor}),
+        ):
+            started = time.perf_counter()
+            response = client.get('/api/recipes/', {
+                'ordering': ordering, 'limit': 6, **params,
+            })
+            timings[mode] = time.perf_counter() - started
+            assert len(response.json()['results']) == 6
+        print(
+            f'\n{ordering}, страница {page}: '
+            f'page {timings["page"] * 1000:.1f} мс, '
+            f'cursor {timings["cursor"] * 1000:.1f} мс'
+        )
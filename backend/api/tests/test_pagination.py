@@ -0,0 +1,136 @@
+import base64
+import json
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.pagination import CustomPageNumberPagination
+from api.views import RecipeViewSet
+from recipes.models import Recipe
+
+
+def encode(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def walk(client, path):
+    ids, url = [], path
+    while url:
+        data = client.get(url).json()
+        ids += [recipe['id'] for recipe in data['results']]
+        url = data['next']
+    return ids
+
+
+@pytest.fixture
+def same_millisecond_recipes(make_recipes):
+    recipes = make_recipes(8, ingredient_count=1)
+    moment = timezone.now().replace(microsecond=1000)
+    for index, recipe in enumerate(recipes):
+        # Пары рецептов отличаются на микросекунды внутри одной миллисекунды.
+        Recipe.objects.filter(pk=recipe.pk).update(
+            created=moment + timedelta(milliseconds=index // 2,
+                                       microseconds=index % 2)
+        )
+    return recipes
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ordering', ['created', '-created'])
+def test_cursor_walk_over_created_is_exact(
+    client, same_millisecond_recipes, ordering
+):
+    ids = walk(client, f'/api/recipes/?cursor=&ordering={ordering}&limit=3')
+    expected = [recipe.id for recipe in same_millisecond_recipes]
+    if ordering.startswith('-'):
+        expected.reverse()
+    assert ids == expected
+
+
+@pytest.mark.django_db
+def test_cursor_walk_over_default_ordering(client, make_recipes):
+    recipes = make_recipes(7, ingredient_count=1)
+    assert walk(client, '/api/recipes/?cursor=&limit=3') == [
+        recipe.id for recipe in recipes
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cursor', [
+    encode(['abc']),
+    encode([{'a': 1}]),
+    encode([[1]]),
+    encode([1, 2, 3]),
+    encode({'id': 1}),
+    'not-base64!',
+])
+def test_invalid_cursor_is_not_found(client, make_recipes, cursor):
+    make_recipes(2, ingredient_count=1)
+    assert client.get(f'/api/recipes/?cursor={cursor}').status_code == 404
+
+
+@pytest.mark.django_db
+def test_invalid_created_cursor_is_not_found(client, make_recipes):
+    make_recipes(2, ingredient_count=1)
+    cursor = encode(['yesterday', 1])
+    response = client.get(f'/api/recipes/?ordering=created&cursor={cursor}')
+    assert response.status_code == 404
+
+
+def walk_pages(client, path):
+    pages, url = [], path
+    while url:
+        data = client.get(url).json()
+        pages.append(data)
+        url = data['next']
+    return pages
+
+
+def count_queries(client, path):
+    with CaptureQueriesContext(connection) as queries:
+        data = client.get(path).json()
+    return data['count'], [
+        query['sql'] for query in queries if 'COUNT(' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+def test_default_count_is_exact_and_cached(client, make_recipes):
+    make_recipes(7, ingredient_count=1)
+    count, first = count_queries(client, '/api/recipes/?limit=3')
+    assert count == 7
+    assert len(first) == 1
+    assert count_queries(client, '/api/recipes/?limit=3&page=2') == (7, [])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('strategy', ['exact', 'cached', 'estimate'])
+def test_page_walk_reports_count(
+    client, make_recipes, monkeypatch, strategy
+):
+    monkeypatch.setattr(RecipeViewSet, 'count_strategy', strategy)
+    recipes = make_recipes(7, ingredient_count=1)
+    pages = walk_pages(client, '/api/recipes/?limit=3')
+    assert [page['count'] for page in pages] == [7, 7, 7]
+    assert sum(len(page['results']) for page in pages) == len(recipes)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('strategy', ['cached', 'estimate'])
+def test_stale_count_does_not_hide_pages(
+    client, make_recipes, monkeypatch, strategy
+):
+    monkeypatch.setattr(RecipeViewSet, 'count_strategy', strategy)
+    monkeypatch.setitem(
+        CustomPageNumberPagination.count_functions,
+        strategy, lambda queryset: 1
+    )
+    recipes = make_recipes(7, ingredient_count=1)
+    pages = walk_pages(client, '/api/recipes/?limit=3')
+    assert len(pages) == 3
+    assert sum(len(page['results']) for page in pages) == len(recipes)
+    assert client.get('/api/recipes/?limit=3&page=3').status_code == 200
+    assert client.get('/api/recipes/?limit=3&page=4').json()['results'] == []
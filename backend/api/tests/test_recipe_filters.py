@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from api.filters import RecipeFilterBackend
+from recipes.models import Recipe, Tag
+
+
+def ids(client, query):
+    response = client.get('/api/recipes/?limit=50&' + query)
+    assert response.status_code == 200
+    data = response.json()
+    assert data['count'] == len(data['results'])
+    return sorted(recipe['id'] for recipe in data['results'])
+
+
+def filtered(query):
+    request = APIRequestFactory().get('/api/recipes/?' + query)
+    return RecipeFilterBackend(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    ).qs
+
+
+@pytest.fixture
+def tagged(make_recipes, tags):
+    """Рецепты с тегами: оба первых, только первый, только третий."""
+    both, first, third = make_recipes(3, ingredient_count=1)
+    first.tags.set(tags[:1])
+    third.tags.set(tags[2:])
+    return both.id, first.id, third.id
+
+
+@pytest.mark.django_db
+def test_recipe_with_several_tags_is_listed_once(client, tagged):
+    both, first, third = tagged
+    assert ids(client, 'tags=tag-0&tags=tag-1') == [both, first]
+    assert ids(client, 'tags=tag-1&tags=tag-2') == [both, third]
+
+
+@pytest.mark.django_db
+def test_tag_filter_uses_subquery_without_distinct(tagged):
+    sql, params = filtered('tags=tag-0&tags=tag-1').query.sql_with_params()
+    assert 'DISTINCT' not in sql
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = ' '.join(row[-1] for row in cursor.fetchall())
+    assert 'recipes_recipe_tags_tag_recipe_idx' in plan
+
+
+@pytest.mark.django_db
+def test_favorite_and_cart_filters(client, user, cart, tagged):
+    both, first, third = tagged
+    user.favorite_recipes.add(first)
+    cart.recipes.add(both, third)
+    assert ids(client, 'is_favorited=1') == [first]
+    assert ids(client, 'is_in_shopping_cart=true') == [both, third]
+    assert ids(client, 'is_favorited=0') == sorted(tagged)
+    assert ids(client, 'is_favorited=1&is_in_shopping_cart=1') == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('param', ['is_favorited', 'is_in_shopping_cart'])
+def test_anonymous_personal_filters_are_empty(anon_client, tagged, param):
+    assert ids(anon_client, f'{param}=1') == []
+
+
+@pytest.mark.django_db
+def test_cart_filter_without_cart_is_empty(client, tagged):
+    assert ids(client, 'is_in_shopping_cart=1') == []
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_tag_filter_plans_at_scale(author, tags):
+    total = 100000
+    Recipe.objects.bulk_create([
+        Recipe(name=f'Рецепт {number}', text='Текст' * 200, author=author,
+               cooking_time=5)
+        for number in range(total)
+    ], batch_size=500)
+    Tag.recipes.through.objects.bulk_create([
+        Tag.recipes.through(recipe_id=recipe_id, tag_id=tag.id)
+        for recipe_id in Recipe.objects.values_list('id', flat=True)
+        for tag in tags[:2]
+    ], batch_size=500)
+    slugs = [tag.slug for tag in tags[:2]]
+    querysets = {
+        'distinct': Recipe.objects.filter(tags__slug__in=slugs).distinct(),
+        'id__in': filtered('tags=' + '&tags='.join(slugs)),
+    }
+    for name, queryset in querysets.items():
+        started = time.perf_counter()
+        assert queryset.count() == total
+        assert len(queryset.order_by('-id')[:6]) == 6
+        elapsed = time.perf_counter() - started
+        print(f'\nфильтр по тегам, {name}: {elapsed * 1000:.1f} мс')
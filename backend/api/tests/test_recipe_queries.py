@@ -0,0 +1,33 @@
+import pytest
+
+PAGE_SIZE = 6
+# Токен, COUNT(*), страница, теги, ингредиенты, подписки авторов.
+LIST_QUERIES = 6
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('recipe_count', [PAGE_SIZE, PAGE_SIZE * 3])
+@pytest.mark.parametrize('ingredient_count', [1, 12])
+def test_recipe_list_query_count_is_pinned_to_page(
+    client, make_recipes, django_assert_num_queries,
+    recipe_count, ingredient_count
+):
+    make_recipes(recipe_count, ingredient_count=ingredient_count)
+    with django_assert_num_queries(LIST_QUERIES):
+        response = client.get('/api/recipes/')
+    results = response.json()['results']
+    assert len(results) == PAGE_SIZE
+    assert all(
+        len(recipe['ingredients']) == ingredient_count for recipe in results
+    )
+
+
+@pytest.mark.django_db
+def test_recipe_detail_keeps_ingredient_format(client, make_recipes):
+    recipe, = make_recipes(1, ingredient_count=2)
+    response = client.get(f'/api/recipes/{recipe.id}/')
+    assert response.json()['ingredients'] == [
+        {'id': amount.ingredient.id, 'name': amount.ingredient.name,
+         'measurement_unit': 'г', 'amount': amount.amount}
+        for amount in recipe.ingredientamount_set.order_by('id')
+    ]
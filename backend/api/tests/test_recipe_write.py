@@ -0,0 +1,75 @@
+import pytest
+
+from recipes.models import IngredientAmount
+
+
+def recipe_body(tags, amounts):
+    return {
+        'name': 'Борщ', 'text': 'Варить', 'cooking_time': 30,
+        'tags': [tags[0].id],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts
+        ],
+    }
+
+
+@pytest.fixture
+def own_recipe(user, make_recipes):
+    recipe, = make_recipes(1, ingredient_count=30, author=user)
+    return recipe
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ingredient', [
+    {'id': 'abc', 'amount': 1},
+    {'id': None, 'amount': 1},
+    {'id': {'a': 1}, 'amount': 1},
+    {'id': 999999, 'amount': 1},
+    {'amount': 1},
+    {'id': 1},
+    'abc',
+])
+def test_invalid_ingredient_is_bad_request(
+    client, tags, own_recipe, ingredient
+):
+    body = recipe_body(tags, [])
+    body['ingredients'] = [ingredient]
+    response = client.put(
+        f'/api/recipes/{own_recipe.id}/', body, format='json'
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_duplicate_ingredients_are_rejected(client, tags, ingredients):
+    body = recipe_body(tags, [(ingredients[0].id, 1), (ingredients[0].id, 2)])
+    response = client.post('/api/recipes/', body, format='json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_editing_large_recipe_writes_only_changed_amounts(
+    client, tags, ingredients, own_recipe, django_assert_max_num_queries
+):
+    stored = list(own_recipe.ingredientamount_set.order_by('id'))
+    amounts = [(amount.ingredient_id, amount.amount) for amount in stored]
+    amounts[0] = (amounts[0][0], 100)
+    amounts[-1] = (ingredients[35].id, 5)
+    body = recipe_body(tags, amounts)
+    with django_assert_max_num_queries(40) as context:
+        response = client.put(
+            f'/api/recipes/{own_recipe.id}/', body, format='json'
+        )
+    assert response.status_code == 200, response.json()
+    ingredient_queries = [
+        query['sql'] for query in context.captured_queries
+        if '"recipes_ingredient' in query['sql']
+    ]
+    # in_bulk, текущие количества, удаление, вставка, обновление и
+    # чтение для ответа — независимо от числа ингредиентов.
+    assert len(ingredient_queries) == 6
+    assert sorted(
+        own_recipe.ingredientamount_set.values_list('ingredient_id', 'amount')
+    ) == sorted(amounts)
+    assert IngredientAmount.objects.filter(pk=stored[1].pk).exists()
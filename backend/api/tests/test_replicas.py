@@ -0,0 +1,66 @@
+import pytest
+
+from api.checks import check_shared_caches
+from recipes.models import Tag
+from users.models import User
+
+DATABASES = ['default', 'replica_0']
+
+
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ['replica_0']
+    Tag.objects.using('replica_0').create(
+        name='С реплики', color='#000000', slug='replica'
+    )
+
+
+def tag_slugs(client):
+    return [tag['slug'] for tag in client.get('/api/tags/').data]
+
+
+@pytest.mark.django_db(databases=DATABASES)
+def test_list_reads_from_replica(anon_client, tags, replica):
+    assert tag_slugs(anon_client) == ['replica']
+
+
+@pytest.mark.django_db(databases=DATABASES)
+def test_reads_go_to_primary_without_replicas(anon_client, tags):
+    Tag.objects.using('replica_0').create(
+        name='С реплики', color='#000000', slug='replica'
+    )
+    assert tag_slugs(anon_client) == [tag.slug for tag in tags]
+
+
+@pytest.mark.django_db(databases=DATABASES)
+def test_user_reads_own_writes_from_primary(
+    client, anon_client, user, make_recipes, replica
+):
+    recipe, = make_recipes(1, ingredient_count=1)
+    detail = f'/api/recipes/{recipe.id}/'
+    assert client.get(detail).status_code == 404
+    response = client.post(f'/api/recipes/{recipe.id}/favorite/')
+    assert response.status_code == 201
+    favorites = User.favorite_recipes.through.objects
+    assert favorites.using('default').filter(user=user).exists()
+    assert not favorites.using('replica_0').exists()
+    assert client.get(detail).status_code == 200
+    assert anon_client.get(detail).status_code == 404
+
+
+@pytest.mark.django_db(databases=DATABASES)
+def test_sticky_period_expires(client, make_recipes, replica, settings):
+    settings.DATABASE_REPLICA_STICKY_SECONDS = -1
+    recipe, = make_recipes(1, ingredient_count=1)
+    client.post(f'/api/recipes/{recipe.id}/favorite/')
+    assert client.get(f'/api/recipes/{recipe.id}/').status_code == 404
+
+
+def test_process_local_replication_cache_is_an_error(settings):
+    settings.DATABASE_REPLICAS = ['replica_0']
+    errors = [error.id for error in check_shared_caches(None)]
+    assert 'api.E001' in errors
+    settings.CACHES = {**settings.CACHES, 'replication': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    }}
+    assert 'api.E001' not in [error.id for error in check_shared_caches(None)]
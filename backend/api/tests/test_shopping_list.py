@@ -0,0 +1,131 @@
+import json
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.services import get_shopping_list
+from recipes.models import Ingredient, IngredientAmount, ShopingCart
+
+
+def download(client):
+    response = client.get('/api/recipes/download_shopping_cart/?format=json')
+    assert response.status_code == 200
+    return json.loads(b''.join(response.streaming_content))
+
+
+@pytest.fixture
+def recipe_with(make_recipes):
+    def recipe_with(items):
+        recipe, = make_recipes(1, ingredient_count=0)
+        IngredientAmount.objects.bulk_create([
+            IngredientAmount(
+                recipe=recipe, amount=amount,
+                ingredient=Ingredient.objects.create(
+                    name=name, measurement_unit=unit
+                )
+            ) for name, unit, amount in items
+        ])
+        return recipe
+    return recipe_with
+
+
+@pytest.mark.django_db
+def test_totals_are_summed_per_ingredient(client, cart, make_recipes):
+    recipes = make_recipes(3, ingredient_count=2)
+    cart.recipes.add(*recipes)
+    rows = download(client)
+    assert [row['amount'] for row in rows] == [3, 6]
+
+
+@pytest.mark.django_db
+def test_recipe_in_other_carts_is_counted_once(client, cart, make_recipes):
+    recipe, = make_recipes(1, ingredient_count=2)
+    cart.recipes.add(recipe)
+    for _ in range(3):
+        ShopingCart.objects.create().recipes.add(recipe)
+    assert [row['amount'] for row in download(client)] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_same_name_in_different_units_is_kept_apart(
+    client, cart, recipe_with
+):
+    cart.recipes.add(recipe_with([('соль', 'г', 5), ('соль', 'ст. л.', 1)]))
+    assert {
+        (row['name'], row['measurement_unit']): row['amount']
+        for row in download(client)
+    } == {('соль', 'г'): 5, ('соль', 'ст. л.'): 1}
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+def test_large_cart_is_one_query(cart, make_recipes):
+    recipes = make_recipes(600, ingredient_count=12)
+    cart.recipes.add(*recipes)
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        rows = list(get_shopping_list(cart))
+    elapsed = time.perf_counter() - started
+    print(f'\nсписок покупок, 600 рецептов: {elapsed * 1000:.1f} мс')
+    assert len(queries) == 1
+    assert [row['amount'] for row in rows] == [
+        600 * (index + 1) for index in range(12)
+    ]
+
+
+def aggregate_queries(client):
+    with CaptureQueriesContext(connection) as queries:
+        rows = download(client)
+    return rows, [q for q in queries.captured_queries if 'SUM(' in q['sql']]
+
+
+@pytest.fixture
+def carted(client, user, cart, make_recipes):
+    recipes = make_recipes(2, ingredient_count=2, author=user)
+    client.post(f'/api/recipes/{recipes[0].id}/shopping_cart/')
+    assert [row['amount'] for row in download(client)] == [1, 2]
+    return recipes
+
+
+@pytest.mark.django_db
+def test_list_is_cached_until_cart_changes(client, carted):
+    rows, queries = aggregate_queries(client)
+    assert [row['amount'] for row in rows] == [1, 2] and not queries
+    assert client.post(
+        f'/api/recipes/{carted[1].id}/shopping_cart/'
+    ).status_code == 201
+    assert [row['amount'] for row in download(client)] == [2, 4]
+    assert client.delete(
+        f'/api/recipes/{carted[0].id}/shopping_cart/'
+    ).status_code == 204
+    assert [row['amount'] for row in download(client)] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_editing_carted_recipe_refreshes_list(
+    client, carted, tags, ingredients
+):
+    response = client.put(f'/api/recipes/{carted[0].id}/', {
+        'name': carted[0].name, 'text': 'Текст', 'cooking_time': 5,
+        'tags': [tags[0].id],
+        'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+    }, format='json')
+    assert response.status_code == 200
+    assert [row['amount'] for row in download(client)] == [10]
+
+
+@pytest.mark.django_db
+def test_deleting_carted_recipe_refreshes_list(client, carted):
+    assert client.delete(f'/api/recipes/{carted[0].id}/').status_code == 204
+    assert download(client) == []
+
+
+@pytest.mark.django_db
+def test_long_list_is_streamed_without_caching(client, carted, settings):
+    settings.SHOPPING_LIST_CACHE_MAX_ROWS = 1
+    client.post(f'/api/recipes/{carted[1].id}/shopping_cart/')
+    for _ in range(2):
+        rows, queries = aggregate_queries(client)
+        assert [row['amount'] for row in rows] == [2, 4] and queries
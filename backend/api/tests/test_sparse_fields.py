@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import User
+
+
+def fetch(client, url):
+    """Ответ и SQL запроса, начиная с чтения страницы."""
+    client.get(url)  # Прогревает кэш токенов и счетчиков.
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json()['results'], [query['sql'] for query in queries]
+
+
+def select_from(sqls, table):
+    return [
+        sql for sql in sqls
+        if sql.startswith('SELECT') and f'FROM "{table}"' in sql
+    ]
+
+
+@pytest.mark.django_db
+def test_recipe_list_defers_unrequested_columns(client, make_recipes):
+    make_recipes(2)
+    results, sqls = fetch(client, '/api/recipes/?fields=name,cooking_time')
+    assert set(results[0]) == {'id', 'name', 'cooking_time'}
+    page, = select_from(sqls, 'recipes_recipe')
+    assert '"recipes_recipe"."name"' in page
+    assert '"recipes_recipe"."text"' not in page
+    assert '"recipes_recipe"."image"' not in page
+    assert '"users_user"' not in page
+    assert len(sqls) == 1  # Токен и COUNT(*) берутся из кэша.
+
+
+@pytest.mark.django_db
+def test_recipe_list_reads_all_columns_without_fields(client, make_recipes):
+    make_recipes(2)
+    _, sqls = fetch(client, '/api/recipes/')
+    page, = select_from(sqls, 'recipes_recipe')
+    assert '"recipes_recipe"."text"' in page
+    assert '"recipes_recipe"."image"' in page
+
+
+@pytest.fixture
+def followed(user, make_recipes):
+    author = User.objects.create(
+        username='followed', email='followed@example.com',
+        first_name='Имя', last_name='Фамилия'
+    )
+    make_recipes(2, author=author)
+    user.subscriptions.add(author)
+    return author
+
+
+@pytest.mark.django_db
+def test_feed_defers_unrequested_author_columns(client, followed):
+    results, sqls = fetch(
+        client, '/api/users/subscriptions/?fields=username,recipes_count'
+    )
+    assert results == [
+        {'id': followed.id, 'username': 'followed', 'recipes_count': 2}
+    ]
+    page = [sql for sql in select_from(sqls, 'users_user') if 'LIMIT' in sql]
+    assert len(page) == 1
+    assert '"users_user"."username"' in page[0]
+    for column in (
+        'email', 'first_name', 'last_name', 'password', 'role'
+    ):
+        assert f'"users_user"."{column}"' not in page[0]
+    assert not select_from(sqls, 'recipes_recipe')
+
+
+@pytest.mark.django_db
+def test_feed_prefetches_recipes_only_when_requested(client, followed):
+    results, sqls = fetch(
+        client, '/api/users/subscriptions/?fields=recipes&recipes_limit=1'
+    )
+    assert len(results[0]['recipes']) == 1
+    recipes, = select_from(sqls, 'recipes_recipe')
+    assert '"recipes_recipe"."text"' not in recipes
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import User
+
+
+@pytest.fixture
+def follow(user, make_recipes):
+    def follow(*recipe_counts):
+        authors = []
+        for count in recipe_counts:
+            number = User.objects.count()
+            author = User.objects.create(
+                username=f'author-{number}',
+                email=f'author-{number}@example.com'
+            )
+            make_recipes(count, ingredient_count=1, author=author)
+            user.subscriptions.add(author)
+            authors.append(author)
+        return authors
+    return follow
+
+
+def feed(client, query=''):
+    response = client.get(f'/api/users/subscriptions/{query}')
+    assert response.status_code == 200
+    return {row['id']: row for row in response.json()['results']}
+
+
+@pytest.mark.django_db
+def test_recipes_limit_caps_recipes_per_author(client, follow):
+    authors = follow(0, 1, 3, 5)
+    rows = feed(client, '?recipes_limit=2')
+    for author in authors:
+        expected = list(
+            author.recipes.order_by('id').values_list('id', flat=True)[:2]
+        )
+        assert [
+            recipe['id'] for recipe in rows[author.id]['recipes']
+        ] == expected
+        assert rows[author.id]['recipes_count'] == author.recipes.count()
+
+
+@pytest.mark.django_db
+def test_without_limit_all_recipes_are_returned(client, follow):
+    authors = follow(1, 4)
+    rows = feed(client)
+    assert [len(rows[author.id]['recipes']) for author in authors] == [1, 4]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', ['', '?recipes_limit=2'])
+def test_feed_query_count_does_not_grow_with_authors(client, follow, query):
+    follow(3, 3)
+    feed(client, query)  # Прогревает кэш токенов.
+    with CaptureQueriesContext(connection) as few:
+        assert len(feed(client, query)) == 2
+    follow(*[3] * 4)
+    with CaptureQueriesContext(connection) as many:
+        assert len(feed(client, query)) == 6
+    assert len(many) == len(few)
@@ -1,11 +1,10 @@
 from django.conf import settings
-from django.http import FileResponse
+from django.http import Http404, StreamingHttpResponse
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.contrib.auth.hashers import check_password
 from django.core.mail import send_mail
 from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg
+from django.db.models import Avg, Case, When, Value, IntegerField
 from django_filters import rest_framework as filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.exceptions import ValidationError
@@ -31,7 +30,14 @@ from .permissions import (
     AdminModeratorAuthorPermission, IsAdminOrReadOnly,
     AdminOnly, AuthorPermission, IsAuthenticatedOrReadOnly
 )
-from .services import get_file
+from .services import (
+    bump_cart_version, get_shopping_list, get_viewer_state,
+    get_recipe_read_queryset, get_requested_fields, get_subscription_queryset,
+    prefetch_author_recipes
+)
+from .cache import CatalogueCacheMixin
+from .replicas import ReplicaReadMixin
+from .exports import SHOPPING_LIST_RENDERERS
 from .filters import RecipeFilterBackend
 from .pagination import CustomPageNumberPagination
 
@@ -46,26 +52,44 @@ class AccountActivationTokenGenerator(PasswordResetTokenGenerator):
 account_activation_token = AccountActivationTokenGenerator()
 
 
+class ViewerStateMixin:
+    """Один раз на запрос собирает состояние пользователя для страницы."""
+
+    viewer_state_actions = ('list', 'retrieve')
+
+    def resolve_viewer_state(self, objs):
+        raise NotImplementedError
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.action in self.viewer_state_actions:
+            objs = args[0] if kwargs.get('many') else [args[0]]
+            kwargs.setdefault('context', self.get_serializer_context())
+            kwargs['context']['viewer_state'] = self.resolve_viewer_state(
+                objs
+            )
+        return super().get_serializer(*args, **kwargs)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def get_token(request):
     serializer = TokenSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    user = get_object_or_404(
-        User, 
-        email=serializer.validated_data.get('email'),
-    )
-    if not check_password(
-        serializer.validated_data.get('password'), user.password
-    ):
+    email = serializer.validated_data.get('email')
+    # Точное совпадение email важнее совпадения без учёта регистра.
+    user = User.objects.filter(email__iexact=email).order_by(
+        Case(When(email=email, then=Value(0)), default=Value(1))
+    ).first()
+    if user is None:
+        raise Http404
+    # check_password у модели пересчитывает хеш, если сменились
+    # хешер или его параметры.
+    if not user.check_password(serializer.validated_data.get('password')):
         return Response(
             {'errors': 'Неверный пароль.'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    try:
-        token = Token.objects.get(user=user)
-    except Token.DoesNotExist:
-        token = Token.objects.create(user=user)
+    token, _ = Token.objects.get_or_create(user=user)
     resp = {
         'auth_token': token.key,
     }
@@ -82,7 +106,7 @@ def logout(request):
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class UsersViewSet(ModelViewSet):
+class UsersViewSet(ReplicaReadMixin, ViewerStateMixin, ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
@@ -90,6 +114,9 @@ class UsersViewSet(ModelViewSet):
     pagination_class = PageNumberPagination
     search_fields = ('^username', '^email')
 
+    def resolve_viewer_state(self, users):
+        return get_viewer_state(self.request.user, authors=users)
+
     def create(self, request):
         serializer = RegistrationSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -139,18 +166,21 @@ class UsersViewSet(ModelViewSet):
     )
     def subscriptions(self, request):
         self.pagination_class.page_size = 6
-        queryset = User.objects.filter(
-            subscription__in=[User.objects.get(id=request.user.id)]
+        fields = get_requested_fields(request)
+        queryset = get_subscription_queryset(
+            User.objects.filter(subscription=request.user), fields
         )
-        recipes_limit = self.request.GET.get('recipes_limit', None)
-        
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
+        recipes_limit = self.request.GET.get('recipes_limit', '')
         page = self.paginate_queryset(queryset)
+        authors = page if page is not None else list(queryset)
+        if fields is None or 'recipes' in fields:
+            prefetch_author_recipes(
+                authors,
+                int(recipes_limit) if recipes_limit.isdigit() else None
+            )
+        serializer = self.get_serializer(authors, many=True)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)  
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
@@ -188,30 +218,57 @@ class UsersViewSet(ModelViewSet):
             request.user.set_password(
                 serializer.validated_data.get('new_password')
             )
-            request.user.save()
+            request.user.save(update_fields=['password'])
         return Response(serializer.validated_data, status=status.HTTP_201_CREATED)
 
 
-class TagViewSet(ModelViewSet):
+class TagViewSet(ReplicaReadMixin, CatalogueCacheMixin, ModelViewSet):
+    catalogue_model = Tag
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ViewerStateMixin, ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = CustomPageNumberPagination
+    count_strategy = settings.RECIPE_COUNT_STRATEGY
     search_fields = ('^author', '^tags', '^name')
     queryset = Recipe.objects.all()
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class  = RecipeFilterBackend
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = get_recipe_read_queryset(
+                queryset,
+                self.request.user,
+                get_requested_fields(self.request)
+            )
+        return queryset
+
+    def resolve_viewer_state(self, recipes):
+        fields = get_requested_fields(self.request)
+        if fields is not None and 'author' not in fields:
+            return get_viewer_state(self.request.user)
+        return get_viewer_state(
+            self.request.user,
+            authors=[recipe.author for recipe in recipes]
+        )
+
+    def perform_content_negotiation(self, request, force=False):
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
     def perform_destroy(self, recipe):
+        bump_cart_version(ShopingCart.objects.filter(recipes=recipe))
         self.request.user.favorite_recipes.remove(recipe)
         self.request.user.shoping_cart.recipes.remove(recipe)
         amounts = IngredientAmount.objects.filter(
@@ -262,29 +319,43 @@ class RecipeViewSet(ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        if hasattr(request.user, 'shoping_cart'):
-            shoping_cart = request.user.shoping_cart
-        else:
-            return Response(status=status.HTTP_404_BAD_REQUEST)        
-        send_file = get_file(shoping_cart)
-        response = FileResponse(send_file, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="shopping-list.txt"'
+        shoping_cart = request.user.shoping_cart
+        if shoping_cart is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        renderer = SHOPPING_LIST_RENDERERS.get(
+            request.query_params.get('format', 'txt')
+        )
+        if renderer is None:
+            return Response(
+                {'errors': 'Неподдерживаемый формат.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(
+            renderer.render(get_shopping_list(shoping_cart)),
+            content_type=renderer.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping-list.{renderer.extension}"'
+        )
         return response
 
 
-class IngredientViewSet(ModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, CatalogueCacheMixin, ModelViewSet):
+    catalogue_model = Ingredient
     serializer_class = IngredientSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     search_fields = ('^name',)
     
     def get_queryset(self):
-        queryset = (
-            Ingredient.objects.filter(
-                name__istartswith=str(self.request.query_params.get(
-                    'name'
-                ))
-            ) 
-            if self.request.query_params.get('name') 
-            else Ingredient.objects.all()
-        )
-        return queryset
+        name = self.request.query_params.get('name')
+        if not name:
+            return Ingredient.objects.all()
+        return Ingredient.objects.filter(
+            name__istartswith=name
+        ).annotate(
+            is_exact=Case(
+                When(name__iexact=name, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('is_exact', 'name')
@@ -0,0 +1,17 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def check_default_connection(sender, **kwargs):
+    """Закрывает постоянное соединение с основной базой, если оно умерло.
+
+    Проверяется только default: соединение с репликой открывается лишь
+    для чтения и при первом запросе, а лишний SELECT 1 к каждому алиасу
+    в начале каждого запроса стоил бы дороже редкой ошибки чтения.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if (
+        connection.settings_dict.get('CONN_HEALTH_CHECKS')
+        and connection.connection is not None
+        and not connection.is_usable()
+    ):
+        connection.close()
@@ -83,10 +83,102 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Постоянные соединения: каждый поток воркера держит своё,
+        # т.е. до GUNICORN_WORKERS * GUNICORN_THREADS соединений.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        # Проверка переиспользуемого соединения в начале запроса
+        # (foodgram.db.check_default_connection).
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'false').lower() == 'true'
+        ),
+        # За PgBouncer в режиме transaction серверные курсоры не работают
+        # (профиль infra/docker-compose.pgbouncer.yml).
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_POOLER') == 'pgbouncer',
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=host1,host2:5433.
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(filter(None, os.getenv(
+    'DB_REPLICA_HOSTS', ''
+).split(','))):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+    }
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с primary.
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.getenv('DB_REPLICA_STICKY_SECONDS', 5)
+)
+
+AUTH_TOKEN_CACHE_BACKEND = os.getenv(
+    'AUTH_TOKEN_CACHE_BACKEND',
+    'django.core.cache.backends.memcached.MemcachedCache'
+)
+REPLICATION_CACHE_BACKEND = os.getenv(
+    'REPLICATION_CACHE_BACKEND',
+    'django.core.cache.backends.memcached.MemcachedCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shopping_lists': {
+        'BACKEND': os.getenv(
+            'SHOPPING_LIST_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('SHOPPING_LIST_CACHE_LOCATION', 'shopping-lists'),
+        'TIMEOUT': int(os.getenv('SHOPPING_LIST_CACHE_TIMEOUT', 60 * 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.getenv('SHOPPING_LIST_CACHE_MAX_ENTRIES', 1000)
+            ),
+        },
+    },
+    'catalogue': {
+        'BACKEND': os.getenv(
+            'CATALOGUE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CATALOGUE_CACHE_LOCATION', 'catalogue'),
+        'TIMEOUT': int(os.getenv('CATALOGUE_CACHE_TIMEOUT', 60 * 5)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CATALOGUE_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+    # Общий для всех воркеров: выход из системы сразу действует везде.
+    # memcached ограничен памятью (-m в infra/docker-compose.yml) и сам
+    # вытесняет давние записи; MAX_ENTRIES нужен только локальным кэшам.
+    'auth_tokens': {
+        'BACKEND': AUTH_TOKEN_CACHE_BACKEND,
+        'LOCATION': os.getenv('AUTH_TOKEN_CACHE_LOCATION', 'memcached:11211'),
+        'TIMEOUT': int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {} if 'memcached' in AUTH_TOKEN_CACHE_BACKEND else {
+            'MAX_ENTRIES': int(
+                os.getenv('AUTH_TOKEN_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+    # Тоже общий: после записи на одном воркере следующее чтение
+    # на любом другом должно идти с primary.
+    'replication': {
+        'BACKEND': REPLICATION_CACHE_BACKEND,
+        'LOCATION': os.getenv('REPLICATION_CACHE_LOCATION', 'memcached:11211'),
+        'OPTIONS': {} if 'memcached' in REPLICATION_CACHE_BACKEND else {
+            'MAX_ENTRIES': int(
+                os.getenv('REPLICATION_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -125,6 +217,25 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'mail/')
 
 PASSWORD_RESET_TIMEOUT = 60 * 60 * 24
 
+# Первым идёт хешер из PASSWORD_HASHER: им хешируются новые пароли,
+# старые пересчитываются при входе. Пустые параметры — значения Django.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2_sha256')
+_PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'users.hashers.PBKDF2PasswordHasher',
+    'argon2': 'users.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'users.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS.pop(PASSWORD_HASHER),
+    *_PASSWORD_HASHERS.values(),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 0))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 0))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 0))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 0))
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 0))
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -132,7 +243,7 @@ REST_FRAMEWORK = {
     # 'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPageNumberPagination',
     # 'PAGE_SIZE': 6,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -141,6 +252,17 @@ REST_FRAMEWORK = {
 
 }
 
+# Более длинные списки покупок отдаются потоком без кэширования.
+SHOPPING_LIST_CACHE_MAX_ROWS = int(
+    os.getenv('SHOPPING_LIST_CACHE_MAX_ROWS', 500)
+)
+
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 30)
+)
+# Подсчет рецептов в выдаче: exact, cached, estimate или has_next.
+RECIPE_COUNT_STRATEGY = os.getenv('RECIPE_COUNT_STRATEGY', 'cached')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'AUTH_HEADER_TYPES': ('Bearer', 'Token'),
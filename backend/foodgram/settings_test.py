@@ -0,0 +1,26 @@
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'foodgram-test',
+    },
+    # Отдельная база для тестов маршрутизации на реплику.
+    'replica_0': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'foodgram-test-replica',
+    },
+}
+
+CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    for alias in CACHES  # noqa: F405
+}
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-media-')
@@ -0,0 +1,10 @@
+import os
+
+# При GUNICORN_THREADS > 1 gunicorn сам переключает sync-воркеры на gthread:
+# медленная выгрузка занимает поток, а не весь процесс.
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+errorlog = '-'
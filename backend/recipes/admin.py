@@ -13,8 +13,9 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = ('name', 'author__username', 'tags__slug')
 
     def in_favorites(self, obj):
-        return obj.users.count()
+        return obj.favorites_count
     in_favorites.short_description = 'В избранном'
+    in_favorites.admin_order_field = 'favorites_count'
 
 
 class IngredientAdmin(admin.ModelAdmin):
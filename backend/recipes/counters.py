@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class CounterFieldsMixin:
+    """Не дает save() существующего объекта перезаписать счетчики.
+
+    Счетчики меняются только через shift_counter; значения, прочитанные
+    в начале запроса, затерли бы параллельные F()-инкременты.
+    """
+
+    counter_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if (
+            update_fields is None
+            and not force_insert
+            and not self._state.adding
+        ):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(
+            force_insert=force_insert, force_update=force_update,
+            using=using, update_fields=update_fields
+        )
+
+
+def shift_counter(queryset, field, delta):
+    """Атомарно меняет счетчик на delta без чтения строки."""
+    queryset.update(**{field: F(field) + delta})
+
+
+def add_link(through, queryset, field, **link):
+    """Добавляет строку в связующую таблицу и увеличивает счетчик.
+
+    Счетчик меняется, только если строка действительно вставлена:
+    при параллельной вставке get_or_create получит IntegrityError
+    по unique_together и вернет created=False.
+    """
+    with transaction.atomic():
+        _, created = through.objects.get_or_create(**link)
+        if created:
+            shift_counter(queryset, field, 1)
+    return created
+
+
+def remove_link(through, queryset, field, **link):
+    """Удаляет строку связи и уменьшает счетчик на число удаленных."""
+    with transaction.atomic():
+        deleted, _ = through.objects.filter(**link).delete()
+        if deleted:
+            shift_counter(queryset, field, -deleted)
+    return bool(deleted)
+
+
+def _count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('*')
+            ).values('count'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def recount_counters(recipe_model, user_model):
+    """Пересчитывает все счетчики по связующим таблицам."""
+    recipe_model.objects.update(
+        favorites_count=_count_of(
+            user_model.favorite_recipes.through, 'recipe_id'
+        ),
+        cart_count=_count_of(
+            recipe_model.shoping_cart.through, 'recipe_id'
+        ),
+    )
+    user_model.objects.update(
+        recipes_count=_count_of(recipe_model, 'author_id'),
+        followers_count=_count_of(
+            user_model.subscriptions.through, 'to_user_id'
+        ),
+    )
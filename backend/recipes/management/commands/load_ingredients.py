@@ -0,0 +1,130 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import invalidate_catalogue
+from recipes.models import Ingredient
+
+
+def ingredient_row(name, measurement_unit, where):
+    """Название и единица без пробелов по краям или CommandError."""
+    if not isinstance(name, str) or not isinstance(measurement_unit, str):
+        raise CommandError(f'{where}: name и measurement_unit — строки.')
+    name, measurement_unit = name.strip(), measurement_unit.strip()
+    if not name or not measurement_unit:
+        raise CommandError(f'{where}: пустое name или measurement_unit.')
+    return name, measurement_unit
+
+
+def iter_json(file, chunk_size=64 * 1024):
+    """Объекты JSON-массива по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while not buffer:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        buffer = chunk.lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив.')
+    buffer = buffer[1:]
+    eof = False
+    index = 0
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError('Некорректный JSON.')
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        where = f'Элемент {index}'
+        if not isinstance(obj, dict) or not {
+            'name', 'measurement_unit'
+        } <= obj.keys():
+            raise CommandError(
+                f'{where}: ожидается объект с name и measurement_unit.'
+            )
+        yield ingredient_row(obj['name'], obj['measurement_unit'], where)
+        buffer = buffer[end:]
+        index += 1
+
+
+def iter_csv(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row or row == ['name', 'measurement_unit']:
+            continue
+        where = f'Строка {reader.line_num}'
+        if len(row) != 2:
+            raise CommandError(
+                f'{where}: ожидается два столбца, name и measurement_unit.'
+            )
+        yield ingredient_row(row[0], row[1], where)
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из JSON или CSV файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=('json', 'csv'),
+            help='Формат файла, по умолчанию по расширению.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in ('json', 'csv'):
+            raise CommandError('Поддерживаются только JSON и CSV.')
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        seen = set()
+        batch = []
+        processed = 0
+        with open(path, encoding='utf-8', newline='') as file, \
+                transaction.atomic():
+            rows = iter_json(file) if file_format == 'json' else iter_csv(file)
+            for key in rows:
+                processed += 1
+                if key in seen:
+                    continue
+                seen.add(key)
+                batch.append(
+                    Ingredient(name=key[0], measurement_unit=key[1])
+                )
+                if len(batch) == batch_size:
+                    self._flush(batch, processed, started)
+                    batch = []
+            if batch:
+                self._flush(batch, processed, started)
+        added = Ingredient.objects.count() - before
+        if added:
+            invalidate_catalogue(Ingredient)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {processed} строк, добавлено {added} '
+            f'за {elapsed:.2f} с '
+            f'({processed / max(elapsed, 1e-6):.0f} строк/с).'
+        ))
+
+    def _flush(self, batch, processed, started):
+        Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{processed} строк, {processed / max(elapsed, 1e-6):.0f} строк/с'
+        )
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount_counters
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, корзин, рецептов и подписчиков.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_counters(Recipe, get_user_model())
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
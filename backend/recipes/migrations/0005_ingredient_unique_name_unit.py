@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:06
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    RecipeIngredient = apps.get_model('recipes', 'Recipe').ingredients.through
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        count=Count('id'), keep=Min('id')
+    ).filter(count__gt=1)
+    for group in duplicates:
+        duplicate_ids = Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['keep']).values_list('id', flat=True)
+        for duplicate_id in duplicate_ids:
+            IngredientAmount.objects.filter(
+                ingredient_id=duplicate_id
+            ).update(ingredient_id=group['keep'])
+            RecipeIngredient.objects.filter(
+                ingredient_id=duplicate_id,
+                recipe_id__in=RecipeIngredient.objects.filter(
+                    ingredient_id=group['keep']
+                ).values('recipe_id')
+            ).delete()
+            RecipeIngredient.objects.filter(
+                ingredient_id=duplicate_id
+            ).update(ingredient_id=group['keep'])
+        Ingredient.objects.filter(id__in=list(duplicate_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
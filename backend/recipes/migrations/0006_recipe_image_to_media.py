@@ -0,0 +1,101 @@
+import base64
+import binascii
+import sys
+from uuid import uuid4
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+from recipes.thumbnails import make_thumbnails
+
+BATCH_SIZE = 100
+UNCONVERTED_PATH = 'recipes/images/unconverted/{}.txt'
+
+
+def decode_data_uri(data):
+    """Расширение и байты из data URI или None, если это не base64."""
+    if not data.startswith('data:image') or ';base64,' not in data:
+        return None
+    header, content = data.split(';base64,', 1)
+    try:
+        return header.split('/')[-1], base64.b64decode(content)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def report_skipped(skipped):
+    if skipped:
+        sys.stdout.write(
+            f'\n  Не перенесено изображений: {len(skipped)}, '
+            f'id рецептов: {", ".join(map(str, skipped))}. '
+            f'Исходные значения сохранены в '
+            f'{UNCONVERTED_PATH.format("<id>")}.\n'
+        )
+
+
+def move_images_to_storage(apps, schema_editor):
+    """Переносит base64-изображения в хранилище.
+
+    Значения, которые не удалось разобрать, не теряются вместе со
+    старой колонкой: они сохраняются как есть, а id рецептов выводятся.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    last_id = 0
+    skipped = []
+    while True:
+        batch = list(
+            Recipe.objects.filter(id__gt=last_id).exclude(image='').order_by(
+                'id'
+            ).values_list('id', 'image')[:BATCH_SIZE]
+        )
+        if not batch:
+            report_skipped(skipped)
+            return
+        for recipe_id, data in batch:
+            last_id = recipe_id
+            decoded = decode_data_uri(data)
+            if decoded is None:
+                skipped.append(recipe_id)
+                default_storage.save(
+                    UNCONVERTED_PATH.format(recipe_id),
+                    ContentFile(data.encode())
+                )
+                continue
+            extension, content = decoded
+            name = default_storage.save(
+                f'recipes/images/{uuid4().hex}.{extension}',
+                ContentFile(content)
+            )
+            try:
+                make_thumbnails(default_storage, name)
+            except OSError:
+                pass
+            Recipe.objects.filter(id=recipe_id).update(image_file=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_ingredient_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_file',
+            field=models.ImageField(blank=True, upload_to='recipes/images/', verbose_name='Изображение'),
+        ),
+        migrations.RunPython(
+            move_images_to_storage, migrations.RunPython.noop
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='image',
+        ),
+        migrations.RenameField(
+            model_name='recipe',
+            old_name='image_file',
+            new_name='image',
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def restore_links(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    pairs = IngredientAmount.objects.filter(
+        recipe__isnull=False
+    ).values_list('recipe_id', 'ingredient_id').distinct()
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(recipe_id=recipe, ingredient_id=ingredient)
+        for recipe, ingredient in pairs
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_tags_tag_recipe_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_links),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='recipes', through='recipes.IngredientAmount', to='recipes.Ingredient', verbose_name='Ингредиенты'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 
+from .counters import CounterFieldsMixin
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -39,6 +41,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name} {self.measurement_unit}'
@@ -81,7 +89,9 @@ class IngredientAmount(models.Model):
         super(IngredientAmount, self).save(*args, **kwargs)
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
+    counter_fields = ('favorites_count', 'cart_count')
+
     name = models.CharField(
         verbose_name='Рецепт',
         max_length=200
@@ -108,9 +118,11 @@ class Recipe(models.Model):
         'Ingredient',
         verbose_name='Ингредиенты',
         related_name='recipes',
+        through='IngredientAmount',
     )
-    image = models.TextField(
+    image = models.ImageField(
         verbose_name='Изображение',
+        upload_to='recipes/images/',
         blank=True,
     )
     author = models.ForeignKey(
@@ -119,11 +131,37 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
         related_name='recipes',
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+    )
+    cart_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['favorites_count', 'id'],
+                name='recipe_favorites_id_idx'
+            ),
+            models.Index(
+                fields=['created', 'id'],
+                name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', 'id'],
+                name='recipe_cooking_time_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -136,6 +174,10 @@ class ShopingCart(models.Model):
         related_name='shoping_cart',
         blank=True,
     )
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=0,
+    )
 
     class Meta:
         verbose_name = 'Корзина'
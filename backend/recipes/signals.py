@@ -0,0 +1,68 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from .counters import shift_counter
+from .models import Recipe
+from .thumbnails import delete_image, make_thumbnails
+
+
+def _author(recipe):
+    author_model = Recipe._meta.get_field('author').related_model
+    return author_model.objects.filter(pk=recipe.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        shift_counter(_author(instance), 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    shift_counter(_author(instance), 'recipes_count', -1)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleting(sender, instance, **kwargs):
+    """Связи удаляемого пользователя уходят каскадом, без add/remove_link."""
+    shift_counter(
+        Recipe.objects.filter(users=instance), 'favorites_count', -1
+    )
+    shift_counter(
+        sender.objects.filter(subscription=instance), 'followers_count', -1
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_image(sender, instance, update_fields=None, **kwargs):
+    instance._stored_image = None
+    if instance.pk and (update_fields is None or 'image' in update_fields):
+        instance._stored_image = Recipe.objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_thumbnails(sender, instance, **kwargs):
+    """Миниатюры для нового изображения, старые файлы — после коммита."""
+    stored = getattr(instance, '_stored_image', None)
+    if instance.image and instance.image.name != stored:
+        make_thumbnails(instance.image.storage, instance.image.name)
+    if stored and stored != instance.image.name:
+        transaction.on_commit(
+            partial(delete_image, instance.image.storage, stored)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(
+            delete_image, instance.image.storage, instance.image.name
+        ))
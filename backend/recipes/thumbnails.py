@@ -0,0 +1,49 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+THUMBNAIL_SIZES = {
+    'small': (320, 320),
+    'medium': (640, 640),
+}
+
+
+def thumbnail_name(name, size):
+    base = os.path.splitext(os.path.basename(name))[0]
+    return f'recipes/thumbnails/{base}_{size}.jpg'
+
+
+def make_thumbnails(storage, name):
+    """Сохраняет уменьшенные копии изображения рядом с оригиналом."""
+    with storage.open(name, 'rb') as file:
+        image = Image.open(file)
+        image.load()
+    image = image.convert('RGB')
+    for size, dimensions in THUMBNAIL_SIZES.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail(dimensions)
+        buffer = BytesIO()
+        thumbnail.save(buffer, 'JPEG', quality=85)
+        path = thumbnail_name(name, size)
+        if storage.exists(path):
+            storage.delete(path)
+        storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def delete_image(storage, name):
+    """Удаляет изображение вместе с его уменьшенными копиями."""
+    for path in (name, *(
+        thumbnail_name(name, size) for size in THUMBNAIL_SIZES
+    )):
+        storage.delete(path)
+
+
+def thumbnail_urls(image):
+    if not image:
+        return {}
+    return {
+        size: image.storage.url(thumbnail_name(image.name, size))
+        for size in THUMBNAIL_SIZES
+    }
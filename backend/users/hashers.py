@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = getattr(
+        settings, 'PASSWORD_PBKDF2_ITERATIONS', None
+    ) or hashers.PBKDF2PasswordHasher.iterations
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = getattr(
+        settings, 'PASSWORD_ARGON2_TIME_COST', None
+    ) or hashers.Argon2PasswordHasher.time_cost
+    memory_cost = getattr(
+        settings, 'PASSWORD_ARGON2_MEMORY_COST', None
+    ) or hashers.Argon2PasswordHasher.memory_cost
+    parallelism = getattr(
+        settings, 'PASSWORD_ARGON2_PARALLELISM', None
+    ) or hashers.Argon2PasswordHasher.parallelism
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    rounds = getattr(
+        settings, 'PASSWORD_BCRYPT_ROUNDS', None
+    ) or hashers.BCryptSHA256PasswordHasher.rounds
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:11
+
+from django.db import migrations, models
+
+from recipes.counters import recount_counters
+
+
+def fill_counters(apps, schema_editor):
+    recount_counters(
+        apps.get_model('recipes', 'Recipe'),
+        apps.get_model('users', 'User')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('recipes', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,11 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import RegexValidator
 
+from recipes.counters import CounterFieldsMixin
 from recipes.models import Recipe
 
 
-class User(AbstractUser):
+class User(CounterFieldsMixin, AbstractUser):
     USER = 'user'
     MODERATOR = 'moderator'
     ADMIN = 'admin'
@@ -61,6 +62,16 @@ class User(AbstractUser):
         blank=True,
         null=True
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     @property
     def is_admin(self):